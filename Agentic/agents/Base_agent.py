@@ -1,22 +1,45 @@
+import os
 from google.adk.agents import LlmAgent
 from google.adk.tools import AgentTool
+from tools import submit_final_result
+from utils.gemini_model import gemini_model
+from utils.context_compaction import compact_instruction, trim_history, record_prompt_tokens
+from utils.metrics import start_agent_span, end_agent_span, record_llm_call
 from agents.requirement_gatherer_agent import Requirement_gatherer
 from agents.web_info_agent import Web_info
 from agents.improvement import Orchestrator_Agent
 from agents.image_agent import image_generation_agent
+from agents.content_agent import Content_Agent
 
 # Wrap tools
 web_info_tool = AgentTool(Web_info)
 image_tool = AgentTool(image_generation_agent)
 
+# Report results through the submit_final_result tool instead of free text, so no response parsing is needed
+STRUCTURED_RESULT = os.getenv("STRUCTURED_RESULT", "false").lower() in ("1", "true", "yes")
+
+# Generate text and image concurrently (Content_Agent) when a post needs both
+PARALLEL_CONTENT = os.getenv("PARALLEL_CONTENT", "true").lower() in ("1", "true", "yes")
+
+PARALLEL_CONTENT_INSTRUCTION = (
+    "\n\n5. If the `post_type` needs both text and a visual (e.g., flyer, poster, infographic) and neither "
+    "{final_post} nor {final_image} is up to date, call the `Content_Agent` instead of calling the "
+    "`Orchestrator_Agent` and the `image_tool` one after the other: it generates both at the same time."
+)
+
+STRUCTURED_RESULT_INSTRUCTION = (
+    "\n\n4. Whenever you return post or image results, first call `submit_final_result` with "
+    "`final_post` set to the final post text (if text was generated) and `generated_image` set to true if an image was generated."
+)
+
 Base = LlmAgent(
     name="Base_agent",
-    model="gemini-2.5-flash",
+    model=gemini_model(),
     description=(
         "Root agent that coordinates requirement gathering, optional web info retrieval, "
         "text and image content generation, and refinement to produce the final polished content."
     ),
-    instruction=(
+    instruction=compact_instruction((
         "1. Check the user's query. If the user is not explicitly asking to generate a post or visual content, "
         "have a normal conversation. Answer questions, explain your capabilities, or provide general assistance. "
         "Do not start any post generation steps.\n\n"
@@ -33,20 +56,28 @@ Base = LlmAgent(
         "and only if the user explicitly asked for a post in their query.\n\n"
 
         "   e. Call the `image_tool` to generate an image only if `post_type` indicates a visual post "
-        "(e.g., flyer, poster, infographic), {final_image} is not yet set, and only if the user explicitly asked for a post in their query.\n\n"
+        "(e.g., flyer, poster, infographic), {final_image} is not yet set or 'image' is in {stale_stages?}, "
+        "and only if the user explicitly asked for a post in their query.\n\n"
 
         "   f. If the user updates any values in their query (e.g., changes the text, post_type, or other requirements), "
-        "update the corresponding {problem_config}, {web_info_output}, {final_post}, or {final_image} values as needed "
-        "without restarting the entire workflow.\n\n"
+        "update {problem_config} through the `Requirement_gatherer`, then re-run ONLY the stages listed in {stale_stages?} "
+        "('web_info' -> `web_info_tool`, 'post' -> `Orchestrator_Agent`, 'image' -> `image_tool`). "
+        "Outputs of stages not listed are still up to date: reuse them instead of restarting the entire workflow.\n\n"
 
         "3. Return the final results: {final_post} for text, and if image is generated only send an object {'generated_image': True} only. "
         "Do not repeat any previous steps unnecessarily; only call each agent when its output is needed and matches the `post_type`, "
         "and only if the user explicitly requested post generation in their query."
-    ),
+    ) + (STRUCTURED_RESULT_INSTRUCTION if STRUCTURED_RESULT else "") + (
+        PARALLEL_CONTENT_INSTRUCTION if PARALLEL_CONTENT else ""
+    )),
+    before_agent_callback=start_agent_span,
+    after_agent_callback=end_agent_span,
+    before_model_callback=trim_history,
+    after_model_callback=[record_prompt_tokens, record_llm_call],
     sub_agents=[
         Requirement_gatherer,
         Orchestrator_Agent,
         image_generation_agent
-    ],
-    tools=[web_info_tool, image_tool]
+    ] + ([Content_Agent] if PARALLEL_CONTENT else []),
+    tools=[web_info_tool, image_tool] + ([submit_final_result] if STRUCTURED_RESULT else [])
 )
@@ -1,8 +1,25 @@
-from .requirement_gatherer_agent import Requirement_gatherer
-from .web_info_agent import Web_info
-from .generate_refine_refactor.text_agent import Text_generator
-from .generate_refine_refactor.refine_agent import Refine_agent
-from .generate_refine_refactor.refactor_agent import Refactor_agent
-from .loop_agent import Refinement_Loop_Agent
-from .Base_agent import Base
-from .image_agent import image_generation_agent
\ No newline at end of file
+import importlib
+
+# Agents are built on first access (PEP 562), so importing the package does not
+# construct every LlmAgent or pull in google.adk. utils.warm_up pre-loads them.
+_EXPORTS = {
+    "Requirement_gatherer": ".requirement_gatherer_agent",
+    "Web_info": ".web_info_agent",
+    "Text_generator": ".generate_refine_refactor.text_agent",
+    "Refine_agent": ".generate_refine_refactor.refine_agent",
+    "Refactor_agent": ".generate_refine_refactor.refactor_agent",
+    "Refinement_Loop_Agent": ".loop_agent",
+    "Base": ".Base_agent",
+    "image_generation_agent": ".image_agent",
+    "Content_Agent": ".content_agent",
+    "BATCH_AGENTS": ".batch_agents",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
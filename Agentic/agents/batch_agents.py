@@ -0,0 +1,12 @@
+from agents.improvement import Orchestrator_Agent
+from agents.image_agent import image_generation_agent
+from agents.content_agent import Content_Agent
+
+# Root agents for batch mode (utils.batch). problem_config comes fully specified from the batch file,
+# so these run the generation stages directly: no Base_agent, no Requirement_gatherer.
+# Clones, because the originals already have a parent in the Base_agent tree.
+BATCH_AGENTS = {
+    "text": Orchestrator_Agent.clone(),
+    "image": image_generation_agent.clone(update={"disallow_transfer_to_parent": True, "disallow_transfer_to_peers": True}),
+    "both": Content_Agent.clone(),
+}
@@ -0,0 +1,52 @@
+import json
+from google.adk.agents import ParallelAgent
+from google.adk.events import Event, EventActions
+from google.genai import types
+from agents.improvement import Orchestrator_Agent
+from agents.image_agent import image_generation_agent
+from utils.stage_graph import is_fresh, stale_stages
+from utils.metrics import start_agent_span, end_agent_span
+
+class ParallelContentAgent(ParallelAgent):
+    """
+    Runs the text branch (Text_generator + Refinement_Loop_Agent) and the image branch at the
+    same time, then joins them: one final event with {"generated_image", "final_post"},
+    also written to state as 'final_result'.
+
+    Both branches only read problem_config and web_info_output, and write different keys.
+    """
+
+    async def _run_async_impl(self, ctx):
+        async for event in super()._run_async_impl(ctx):
+            yield event
+
+        state = ctx.session.state
+        result = {
+            "generated_image": is_fresh("image", state),
+            "final_post": state.get("final_post") if is_fresh("post", state) else None,
+        }
+        print(f"🔀 {self.name} joined: image={result['generated_image']}, post={bool(result['final_post'])}")
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=json.dumps(result))]),
+            # Recomputed from the recorded inputs: the branches finished in either order
+            actions=EventActions(state_delta={"final_result": result, "stale_stages": stale_stages(state)}),
+        )
+
+# An agent can only have one parent, and Base keeps the originals for text-only and image-only
+# posts, so the branches are clones (same names, so prompts, metrics and traces stay the same)
+Content_Agent = ParallelContentAgent(
+    name="Content_Agent",
+    description=(
+        "Generates the post text and its visual at the same time for post types that need both "
+        "(e.g., flyer, poster, infographic), then returns both results."
+    ),
+    sub_agents=[
+        Orchestrator_Agent.clone(),
+        image_generation_agent.clone(update={"disallow_transfer_to_parent": True, "disallow_transfer_to_peers": True}),
+    ],
+    before_agent_callback=start_agent_span,
+    after_agent_callback=end_agent_span,
+)
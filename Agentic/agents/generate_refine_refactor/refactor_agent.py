@@ -1,14 +1,17 @@
 from google.adk.agents import LlmAgent
 from tools import exit_loop
 from google.adk.tools import FunctionTool
+from utils.gemini_model import gemini_model
+from utils.context_compaction import compact_instruction, trim_history, record_prompt_tokens
+from utils.metrics import start_agent_span, end_agent_span, record_llm_call
 
 Refactor_agent = LlmAgent(
-    model="gemini-2.5-flash",
+    model=gemini_model(),
     name="Refactor_agent",
     description=(
         "Refines generated text using refinement suggestions or exits the loop if the text is polished."
     ),
-    instruction=(
+    instruction=compact_instruction(
         "1. Read the text from {generated_post} and the suggestions from {refinement_suggestions}.\n"
         "2. If {refinement_suggestions} is 'refinement_complete', call the `exit_loop` tool to terminate.\n"
         "3. Apply ONLY the refinement suggestions to rewrite the text, preserving the original meaning.\n"
@@ -22,6 +25,10 @@ Refactor_agent = LlmAgent(
         "   - If {refinement_suggestions} is empty, return {generated_post} unchanged.\n"
         "6. Return ONLY the final refined text in {generated_post}, no explanations or metadata."
     ),
+    before_agent_callback=start_agent_span,
+    after_agent_callback=end_agent_span,
+    before_model_callback=trim_history,
+    after_model_callback=[record_prompt_tokens, record_llm_call],
     tools=[FunctionTool(func=exit_loop)],
     output_key="generated_post"
 )
@@ -1,13 +1,16 @@
 from google.adk.agents import LlmAgent
+from utils.gemini_model import gemini_model
+from utils.context_compaction import compact_instruction, trim_history, record_prompt_tokens
+from utils.metrics import start_agent_span, end_agent_span, record_llm_call
 
 Refine_agent = LlmAgent(
-    model="gemini-2.5-flash",
+    model=gemini_model(),
     name="Refine_agent",
     description=(
         "Analyzes generated text and provides refinement suggestions, or signals completion. "
         "Receives context from {problem_config} for requirement-aware refinement."
     ),
-    instruction=(
+    instruction=compact_instruction(
         "1. Read the text from {generated_post} in the state.\n"
         "2. Analyze the text for any remaining grammar issues, clarity problems, poor flow, or mismatches with {problem_config} requirements.\n"
         "3. If the text is clear, grammatically correct, and aligns with requirements, respond EXACTLY with 'refinement_complete'.\n"
@@ -17,5 +20,9 @@ Refine_agent = LlmAgent(
         "7. Do not add ```text ```."
         
     ),
+    before_agent_callback=start_agent_span,
+    after_agent_callback=end_agent_span,
+    before_model_callback=trim_history,
+    after_model_callback=[record_prompt_tokens, record_llm_call],
     output_key="refinement_suggestions"
 )
@@ -1,4 +1,7 @@
 from google.adk.agents import LlmAgent
+from utils.gemini_model import gemini_model
+from utils.context_compaction import compact_instruction, trim_history, record_prompt_tokens
+from utils.metrics import start_agent_span, end_agent_span, record_llm_call
 
 # Mapping for length categories to word ranges
 LENGTH_MAP = {
@@ -8,14 +11,14 @@ LENGTH_MAP = {
 }
 
 Text_generator = LlmAgent(
-    model="gemini-2.5-flash",
+    model=gemini_model(),
     name="Text_generator",
     description=(
         "Generates a complete post (article, blog, short story, etc.) based on "
         "user requirements in 'problem_config' and optional supporting data in 'web_info_output'. "
         "Receives explicit context keys for controlled generation."
     ),
-    instruction=(
+    instruction=compact_instruction(
         "1. Read all relevant fields from {problem_config}: 'post_type', 'title', 'summary', "
         "'tone', 'length', and 'target_audience'.\n"
         "2. Use {web_info_output} if it exists; otherwise, rely solely on problem_config to generate the text. "
@@ -27,5 +30,9 @@ Text_generator = LlmAgent(
         "Do NOT add JSON, keys, or extra commentary. Do not add ```text ```.\n"
         "7. Ensure proper grammar, readability, and professional tone. The text should be polished and ready for publication."
     ),
+    before_agent_callback=start_agent_span,
+    after_agent_callback=end_agent_span,
+    before_model_callback=trim_history,
+    after_model_callback=[record_prompt_tokens, record_llm_call],
     output_key="generated_post"
 )
@@ -1,23 +1,203 @@
 from google.adk import Agent
+from google.adk.events import Event, EventActions
 from tools import image_creator, image_checker
-from google import genai
+from tools.generator_tool import IMAGE_MODEL, generate_image, load_cached_image, store_cached_image
+from tools.image_cache import ImageCache
+from tools.image_checker import score_image
+from tools.image_variants import create_variants
+from utils.result_cache import result_cache_key, await_result, generating, store_result, is_finalized, result_cache_bypassed
+from utils.gemini_model import gemini_model
+from utils.context_compaction import compact_instruction, trim_history, record_prompt_tokens
+from utils.metrics import start_agent_span, end_agent_span, record_llm_call
+from utils.stage_graph import is_fresh, record_stage
+from google.genai import types
 import re
 import os
-from dotenv import load_dotenv
+import json
+import asyncio
+import logging
 
-load_dotenv()
-client = genai.Client()
+# Best-of-N mode: generate this many candidates in parallel and keep the best passing one.
+# 1 keeps the LLM-driven create -> check -> retry flow.
+IMAGE_CANDIDATES = int(os.getenv("IMAGE_CANDIDATES", 1))
+IMAGE_CANDIDATE_CONCURRENCY = int(os.getenv("IMAGE_CANDIDATE_CONCURRENCY", IMAGE_CANDIDATES))
+
+logger = logging.getLogger("orion_logs.image_agent")
+
+def problem_config_cache_key(problem_config: dict) -> str:
+    """ Cache key for the image of a whole problem_config, independent of the prompt the LLM writes. """
+    config = problem_config or {}
+    return ImageCache.make_key(
+        json.dumps(config, sort_keys=True, default=str),
+        config.get("style") or "cheerful",
+        IMAGE_MODEL
+    )
+
+def image_text_from_config(problem_config: dict) -> str:
+    """ The content an image should represent, taken straight from problem_config. """
+    config = problem_config or {}
+    lines = [config.get("title"), config.get("summary")]
+    keywords = config.get("keywords")
+    if keywords:
+        lines.append("Keywords: " + (", ".join(keywords) if isinstance(keywords, list) else str(keywords)))
+    if config.get("target_audience"):
+        lines.append(f"Audience: {config['target_audience']}")
+    if config.get("post_type"):
+        lines.append(f"Format: {config['post_type']}")
+    return "\n".join(str(line) for line in lines if line)
 
 class ImageGenerationAgent(Agent):
+    candidates: int = IMAGE_CANDIDATES
+    candidate_concurrency: int = IMAGE_CANDIDATE_CONCURRENCY
+
+    async def _add_variants(self, image_path: str):
+        """ Platform variants (square, portrait, banner) of the final image; the original stays usable if they fail. """
+        try:
+            await create_variants(image_path)
+        except Exception as e:
+            logger.warning(f"Image variants failed for {image_path}: {e}")
+
+    async def _generate_candidate(self, index: int, text: str, style: str, slots: asyncio.Semaphore):
+        """ Generate and score one candidate. Returns (path, verdict, score) or None. """
+        variation = f"Variation {index + 1} of {self.candidates}: choose a distinct composition and color palette." if index else ""
+        async with slots:
+            path = await generate_image(text, style, variation=variation, use_cache=False)
+        if not isinstance(path, str) or not path.lower().endswith(".png"):
+            print(f"⚠️ Candidate {index + 1} produced no image: {path}")
+            return None
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, score_image, path, text)
+        print(f"Candidate {index + 1}: {result['verdict']} (score {result['score']:.1f})")
+        return path, result["verdict"], result["score"]
+
+    async def _run_best_of_n(self, ctx, config_key: str):
+        """ Fire all candidates at once, check them all, keep the sharpest one that passes. """
+        config = ctx.session.state.get("problem_config") or {}
+        text = image_text_from_config(config)
+        style = config.get("style") or "cheerful"
+        slots = asyncio.Semaphore(max(1, self.candidate_concurrency))
+
+        results = await asyncio.gather(
+            *(self._generate_candidate(i, text, style, slots) for i in range(self.candidates)),
+            return_exceptions=True
+        )
+        passing = [
+            r for r in results
+            if isinstance(r, tuple) and r[1] == "PASS"
+        ]
+        for r in results:
+            if isinstance(r, Exception):
+                print("⚠️ Candidate failed:", r)
+
+        if not passing:
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                content=types.Content(role="model", parts=[types.Part(text='{"generated_image": False}')]),
+            )
+            return
+
+        best_path = max(passing, key=lambda r: r[2])[0]
+        print("✅ Best candidate:", best_path)
+        await self._add_variants(best_path)
+        await store_cached_image(config_key, best_path)
+        await store_cached_image(ImageCache.make_key(text, style, IMAGE_MODEL), best_path)
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text='{"generated_image": True}')]),
+            actions=EventActions(state_delta={"final_image": best_path, **record_stage("image", ctx.session.state)}),
+        )
+
     async def _run_async_impl(self, ctx):
         print("🎨 Inside ImageGenerationAgent")
+
+        # Step 0: The session's image was made from the current image inputs (see utils.stage_graph)
+        current_image = ctx.session.state.get("final_image")
+        if is_fresh("image", ctx.session.state) and os.path.exists(current_image) and not result_cache_bypassed():
+            print("✅ final_image is up to date:", current_image)
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                content=types.Content(role="model", parts=[types.Part(text='{"generated_image": True}')]),
+            )
+            return
+
+        # An image for this exact problem_config already exists (or another session is generating it), skip the LLM and the model
+        problem_config = ctx.session.state.get("problem_config")
+        result_key = result_cache_key("image", problem_config) if is_finalized(problem_config) else None
+        cached_path = await await_result(result_key) if result_key else None
+        if cached_path and not os.path.exists(cached_path):
+            cached_path = None
+        config_key = problem_config_cache_key(problem_config)
+        if not cached_path:
+            cached_path = await load_cached_image(config_key)
+        if cached_path:
+            print("✅ Served final_image from cache:", cached_path)
+            await self._add_variants(cached_path)
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                content=types.Content(role="model", parts=[types.Part(text='{"generated_image": True}')]),
+                actions=EventActions(state_delta={"final_image": cached_path, **record_stage("image", ctx.session.state)}),
+            )
+            return
+
+        with generating(result_key):
+            async for event in self._generate(ctx, config_key, result_key):
+                yield event
+
+    async def _generate(self, ctx, config_key: str, result_key: str):
+        """ Generate a new image for the session, best-of-N or through the LLM's create -> check -> retry flow. """
         last_chunk = None
+        if self.candidates > 1:
+            async for event in self._run_best_of_n(ctx, config_key):
+                best_path = event.actions.state_delta.get("final_image")
+                if best_path and result_key:
+                    store_result(result_key, best_path)
+                yield event
+            return
 
         # Step 1: Run image creation and validation
+        created_path = None
+        approved_path = None
+        calls = {}          # function call id -> args
+        prompts = {}        # created path -> (text, style) it was generated from
         async for chunk in super()._run_async_impl(ctx):
             last_chunk = chunk
+            for call in chunk.get_function_calls():
+                calls[call.id] = call.args or {}
+            for result in chunk.get_function_responses():
+                value = (result.response or {}).get("result")
+                args = calls.get(result.id, {})
+                if result.name == image_creator.__name__:
+                    if isinstance(value, str) and value.lower().endswith(".png"):
+                        created_path = value
+                        prompts[value] = (args.get("text", ""), args.get("style") or "cheerful")
+                elif result.name == image_checker.__name__ and value == "PASS" and args.get("image_path") in prompts:
+                    approved_path = args["image_path"]
             yield chunk
 
+        if created_path:
+            await self._add_variants(created_path)
+            # Only an image image_checker passed is cached: a rejected one would be served to every later request
+            if approved_path == created_path:
+                await store_cached_image(config_key, created_path)
+                await store_cached_image(ImageCache.make_key(*prompts[created_path], IMAGE_MODEL), created_path)
+                if result_key:
+                    store_result(result_key, created_path)
+            # Forwarded to the caller's session even when this agent runs as a tool
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                actions=EventActions(state_delta={"final_image": created_path, **record_stage("image", ctx.session.state)}),
+            )
+
         image_path = None
         max_retries = 3
         retries = 0
@@ -57,12 +237,12 @@ class ImageGenerationAgent(Agent):
 
 image_generation_agent = ImageGenerationAgent(
     name="image_generation_agent",
-    model="gemini-2.5-flash",
+    model=gemini_model(),
     description=(
         "An agent that generates visuals for social media posts. "
         "It returns the path to the saved image file."
     ),
-    instruction=(
+    instruction=compact_instruction(
         "1. Read the social media post configuration from {problem_config}.\n"
         "2. Extract the core text/content to be visually represented.\n"
         "3. Use `image_creator` to generate an image.\n"
@@ -72,5 +252,9 @@ image_generation_agent = ImageGenerationAgent(
         '7. return an object {\"generated_image\": True} only.\n'
         "DO NOT write anything else, not even ```JSON```"
     ),
+    before_agent_callback=start_agent_span,
+    after_agent_callback=end_agent_span,
+    before_model_callback=trim_history,
+    after_model_callback=[record_prompt_tokens, record_llm_call],
     tools=[image_creator, image_checker]
 )
@@ -1,12 +1,83 @@
 from google.adk.agents import SequentialAgent
+from google.adk.events import Event, EventActions
+from google.genai import types
 from agents import Text_generator
 from agents import Refinement_Loop_Agent
+from agents import Refactor_agent
+from utils.result_cache import result_cache_key, await_result, generating, store_result, is_finalized, result_cache_bypassed
+from utils.stage_graph import POST_EDIT_FIELDS, changed_inputs, record_stage, describe_changes
+from utils.metrics import start_agent_span, end_agent_span
 
-Orchestrator_Agent = SequentialAgent(
+class MemoizedSequentialAgent(SequentialAgent):
+    """
+    SequentialAgent with incremental recomputation and a result cache in front.
+
+    - The post's inputs (see utils.stage_graph) are unchanged: the current final_post is returned.
+    - Only POST_EDIT_FIELDS changed: one Refactor_agent pass edits the current post.
+    - The same finalized problem_config and web_info_output as an earlier run: the cached post is returned.
+      A run for them already in flight in another session is waited for and its post returned.
+    Otherwise the sub-agents run, as they always do for a bypass_cache request.
+    The finished post is written to state as 'final_post'.
+    """
+
+    post_key: str = "generated_post"
+
+    def _post_event(self, ctx, state_delta: dict, text: str = None) -> Event:
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=text)]) if text else None,
+            actions=EventActions(state_delta=state_delta),
+        )
+
+    async def _run_async_impl(self, ctx):
+        state = ctx.session.state
+        # A bypass request regenerates the post from scratch: no up-to-date or edit shortcut
+        changed = None if result_cache_bypassed() else changed_inputs("post", state)
+        if changed == []:
+            print("✅ Final post is up to date")
+            yield self._post_event(ctx, {}, state["final_post"])
+            return
+
+        if changed and all(field in POST_EDIT_FIELDS for field in changed):
+            print(f"✏️ Editing the final post for: {', '.join(changed)}")
+            yield self._post_event(ctx, {
+                self.post_key: state["final_post"],
+                "refinement_suggestions": describe_changes(changed, state),
+            })
+            async for event in Refactor_agent.run_async(ctx):
+                yield event
+            post = ctx.session.state.get(self.post_key)
+            yield self._post_event(ctx, {"final_post": post, **record_stage("post", ctx.session.state)})
+            return
+
+        key = None
+        if is_finalized(state.get("problem_config")):
+            key = result_cache_key("post", state.get("problem_config"), state.get("web_info_output"))
+            cached = await await_result(key)
+            if cached:
+                print("✅ Final post served from result cache")
+                yield self._post_event(ctx, {self.post_key: cached, "final_post": cached, **record_stage("post", state)}, cached)
+                return
+
+        with generating(key):
+            async for event in super()._run_async_impl(ctx):
+                yield event
+
+            post = ctx.session.state.get(self.post_key)
+            if post and key:
+                store_result(key, post)
+        if post:
+            yield self._post_event(ctx, {"final_post": post, **record_stage("post", ctx.session.state)})
+
+Orchestrator_Agent = MemoizedSequentialAgent(
     name="Orchestrator_Agent",
     description=(
         "Generates a complete text and then refines it through an iterative loop. "
         "Passes {problem_config} and {web_info_output} to sub-agents for controlled refinement."
     ),
-    sub_agents=[Text_generator, Refinement_Loop_Agent]
+    sub_agents=[Text_generator, Refinement_Loop_Agent],
+    before_agent_callback=start_agent_span,
+    after_agent_callback=end_agent_span,
 )
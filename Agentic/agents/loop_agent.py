@@ -1,8 +1,119 @@
-from google.adk.agents import LoopAgent, LlmAgent
+import os
+import time
+import difflib
+from typing import Optional
+from google.adk.agents import LoopAgent
+from google.adk.events import Event, EventActions
+from utils.metrics import LOOP_ITERATIONS, LOOP_STOPS, start_agent_span, end_agent_span
 # Assuming the other agents are defined in 'agents.py'
 from agents import Refine_agent, Refactor_agent
 
-Refinement_Loop_Agent = LoopAgent(
+# Stop once a refactor pass changes less than this fraction of the post
+REFINE_MIN_CHANGE = float(os.getenv("REFINE_MIN_CHANGE", 0.02))
+# Optional per-request budgets for the whole loop (unset = no limit)
+REFINE_MAX_SECONDS = float(os.getenv("REFINE_MAX_SECONDS", 0)) or None
+REFINE_MAX_TOKENS = int(os.getenv("REFINE_MAX_TOKENS", 0)) or None
+
+def change_ratio(previous: str, current: str, threshold: float = REFINE_MIN_CHANGE) -> float:
+    """ Fraction of the text that changed between two versions (0 = identical, 1 = completely different). """
+    if previous == current:
+        return 0.0
+    matcher = difflib.SequenceMatcher(None, previous or "", current or "", autojunk=False)
+    # quick_ratio is an upper bound on similarity; only compute the exact ratio when it matters
+    if 1.0 - matcher.quick_ratio() >= threshold:
+        return 1.0 - matcher.quick_ratio()
+    return 1.0 - matcher.ratio()
+
+def normalize_suggestions(suggestions) -> str:
+    return " ".join(str(suggestions or "").lower().split())
+
+class ConvergentLoopAgent(LoopAgent):
+    """
+    LoopAgent that also stops on its own instead of relying on the model to call exit_loop.
+
+    Checked after every sub-agent:
+        - refinement_complete: the suggestions say the text is done
+        - repeated_suggestions: the same suggestions came back as in the previous iteration
+        - time_budget / token_budget: the wall-clock or token budget is used up
+    Checked after every iteration:
+        - converged: the post changed less than min_change since the previous iteration
+    The reason and iteration count are written to state as
+    'refinement_stop_reason' and 'refinement_iterations'.
+    """
+
+    post_key: str = "generated_post"
+    suggestions_key: str = "refinement_suggestions"
+    min_change: float = REFINE_MIN_CHANGE
+    max_seconds: Optional[float] = REFINE_MAX_SECONDS
+    max_tokens: Optional[int] = REFINE_MAX_TOKENS
+
+    def _budget_exceeded(self, started: float, tokens: int) -> Optional[str]:
+        if self.max_seconds and time.monotonic() - started >= self.max_seconds:
+            return "time_budget"
+        if self.max_tokens and tokens >= self.max_tokens:
+            return "token_budget"
+        return None
+
+    async def _run_async_impl(self, ctx):
+        if not self.sub_agents:
+            return
+
+        started = time.monotonic()
+        tokens = 0
+        times_looped = 0
+        stop_reason = None
+        previous_post = ctx.session.state.get(self.post_key)
+        previous_suggestions = None
+
+        while (not self.max_iterations or times_looped < self.max_iterations) and not stop_reason:
+            iteration_suggestions = None
+            for sub_agent in self.sub_agents:
+                async for event in sub_agent.run_async(ctx):
+                    if event.usage_metadata and event.usage_metadata.total_token_count:
+                        tokens += event.usage_metadata.total_token_count
+                    yield event
+                    if event.actions.escalate:
+                        stop_reason = "exit_loop"
+
+                if stop_reason:
+                    break
+
+                suggestions = normalize_suggestions(ctx.session.state.get(self.suggestions_key))
+                if suggestions != iteration_suggestions:
+                    iteration_suggestions = suggestions
+                    if suggestions.strip(" .'\"") == "refinement_complete":
+                        stop_reason = "refinement_complete"
+                    elif suggestions and suggestions == previous_suggestions:
+                        stop_reason = "repeated_suggestions"
+
+                stop_reason = stop_reason or self._budget_exceeded(started, tokens)
+                if stop_reason:
+                    break
+
+            times_looped += 1
+            previous_suggestions = iteration_suggestions
+
+            if not stop_reason:
+                current_post = ctx.session.state.get(self.post_key)
+                if previous_post and current_post and change_ratio(previous_post, current_post, self.min_change) < self.min_change:
+                    stop_reason = "converged"
+                previous_post = current_post
+
+        stop_reason = stop_reason or "max_iterations"
+        print(f"🔁 {self.name} stopped after {times_looped} iteration(s): {stop_reason}")
+        LOOP_ITERATIONS.observe(times_looped, agent=self.name)
+        LOOP_STOPS.inc(agent=self.name, reason=stop_reason)
+        yield Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            actions=EventActions(state_delta={
+                "refinement_stop_reason": stop_reason,
+                "refinement_iterations": times_looped,
+            }),
+        )
+
+Refinement_Loop_Agent = ConvergentLoopAgent(
     name="Refinement_Loop_Agent",
     description=(
         "An agent that iteratively refines and refactors generated text, exiting early if the text is polished."
@@ -11,4 +122,6 @@ Refinement_Loop_Agent = LoopAgent(
     sub_agents=[Refine_agent, Refactor_agent],
     # A safety net to prevent infinite loops
     max_iterations=5,
-)
\ No newline at end of file
+    before_agent_callback=start_agent_span,
+    after_agent_callback=end_agent_span,
+)
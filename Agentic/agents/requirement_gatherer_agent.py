@@ -1,25 +1,30 @@
 from google.adk.agents import LlmAgent
-from tools import update_problem_config_tool
+from tools import update_problem_config_tool, update_problem_config_bulk_tool
+from utils.gemini_model import gemini_model
+from utils.context_compaction import compact_instruction, trim_history, record_prompt_tokens
+from utils.metrics import start_agent_span, end_agent_span, record_llm_call
 
 Requirement_gatherer = LlmAgent(
     name="requirement_gatherer",
-    model="gemini-2.5-flash",
+    model=gemini_model(),
     description=(
         "This agent collects all necessary information for impact stories, blogs, flyers, "
         "or social awareness posts. It extracts info from the user query and fills problem_config, "
         "asking only for missing mandatory details. It also dynamically updates values if the user changes them mid-conversation."
     ),
-    instruction=(
+    instruction=compact_instruction(
         "1. Analyze the user’s query and fill {problem_config} with as many values as possible. "
         "Mandatory keys: 'title', 'summary', 'keywords', 'post_type', 'target_audience'. "
         "Optional keys: 'external_reference_links', 'special_requirements', 'tone', 'style', 'hashtags', 'length', 'language'. "
-        "Use update_problem_config_tool to store each value, ensuring proper type validation and overwriting existing values if needed.\n\n"
+        "Store all extracted values in ONE call to update_problem_config_bulk_tool, passing a single object of key/value pairs. "
+        "If it reports errors, fix only the rejected values and call it once more with the full set. "
+        "Use update_problem_config_tool only when a single key changes.\n\n"
 
         "2. Ask short, clear questions only for missing mandatory keys. "
         "If the query hints at a value (e.g., tone, audience), fill it automatically without asking.\n\n"
 
         "3. Continuously check if the user updates any previously provided values mid-conversation. "
-        "If they do, update the corresponding entries in {problem_config} dynamically using update_problem_config_tool.\n\n"
+        "If they do, update all changed entries in {problem_config} at once using update_problem_config_bulk_tool.\n\n"
 
         "4. If the user cannot or chooses not to answer a missing field, fill it automatically with a reasonable inferred value. "
         "Do not invent new content.\n\n"
@@ -27,5 +32,9 @@ Requirement_gatherer = LlmAgent(
         "5. Continue until all mandatory keys are filled. "
         "Do not generate final content. Ask the user to review and approve the collected information."
     ),
-    tools=[update_problem_config_tool]
+    before_agent_callback=start_agent_span,
+    after_agent_callback=end_agent_span,
+    before_model_callback=trim_history,
+    after_model_callback=[record_prompt_tokens, record_llm_call],
+    tools=[update_problem_config_bulk_tool, update_problem_config_tool]
 )
@@ -1,14 +1,90 @@
+import os
+import re
 from google.adk.agents import LlmAgent
+from google.adk.events import Event, EventActions
 from google.adk.tools import google_search
+from google.genai import types
+from utils.ttl_cache import TTLCache
+from utils.metrics import metrics, start_agent_span, end_agent_span, record_llm_call
+from utils.gemini_model import gemini_model
+from utils.context_compaction import compact_instruction, trim_history, record_prompt_tokens
+from utils.stage_graph import is_fresh, record_stage
+from utils.result_cache import result_cache_bypassed
 
-Web_info = LlmAgent(
-    model="gemini-2.5-flash",
+# Search summaries shared by every session in this process
+WEB_INFO_CACHE_TTL = float(os.getenv("WEB_INFO_CACHE_TTL", 6 * 60 * 60))
+WEB_INFO_CACHE_MAX_ENTRIES = int(os.getenv("WEB_INFO_CACHE_MAX_ENTRIES", 1024))
+
+web_info_cache = TTLCache(max_entries=WEB_INFO_CACHE_MAX_ENTRIES, ttl_seconds=WEB_INFO_CACHE_TTL)
+metrics.register_cache("web_info", web_info_cache.stats)
+
+def web_info_cache_key(problem_config: dict) -> str:
+    """ Normalized title + summary: case, punctuation and whitespace differences map to the same key. """
+    config = problem_config or {}
+    parts = []
+    for field in ("title", "summary"):
+        value = str(config.get(field) or "").lower()
+        value = re.sub(r"[^\w\s]", " ", value)
+        parts.append(" ".join(value.split()))
+    return "|".join(parts)
+
+class CachedWebInfoAgent(LlmAgent):
+    """
+    Web_info that skips search and the LLM when the session's web_info_output is still
+    up to date, or when another session already searched the same title + summary.
+    A bypass_cache request always searches again and replaces the cached summary.
+    """
+
+    def _info_event(self, ctx, text: str) -> Event:
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=types.Content(role="model", parts=[types.Part(text=text)]),
+            actions=EventActions(state_delta={"web_info_output": text, **record_stage("web_info", ctx.session.state)}),
+        )
+
+    async def _run_async_impl(self, ctx):
+        bypass = result_cache_bypassed()
+        if is_fresh("web_info", ctx.session.state) and not bypass:
+            print("✅ Web info is up to date")
+            yield self._info_event(ctx, ctx.session.state["web_info_output"])
+            return
+
+        key = web_info_cache_key(ctx.session.state.get("problem_config"))
+        if key.strip("|") and not bypass:
+            cached = web_info_cache.get(key)
+            if cached is not None:
+                print("✅ Web info served from cache")
+                yield self._info_event(ctx, cached)
+                return
+
+        final_text = None
+        async for event in super()._run_async_impl(ctx):
+            if event.author == self.name and event.is_final_response() and event.content and event.content.parts:
+                text = "".join(part.text for part in event.content.parts if part.text and not part.thought)
+                if text.strip():
+                    final_text = text
+            yield event
+
+        if final_text:
+            if key.strip("|"):
+                web_info_cache.set(key, final_text)
+            yield Event(
+                invocation_id=ctx.invocation_id,
+                author=self.name,
+                branch=ctx.branch,
+                actions=EventActions(state_delta=record_stage("web_info", ctx.session.state)),
+            )
+
+Web_info = CachedWebInfoAgent(
+    model=gemini_model(),
     name="Web_info",
     description=(
         "An agent that performs targeted web searches to gather supporting facts, links, "
         "and relevant data for content generation without exceeding quota limits."
     ),
-    instruction=(
+    instruction=compact_instruction(
         "1. Use ONLY the 'title' and 'summary' from {problem_config} to form concise search queries.\n"
         "2. Perform searches using the `google_search` tool, limiting results to the top 5 most relevant links.\n"
         "3. Collect only the essential facts, statistics, and links, keeping the output concise and relevant.\n"
@@ -16,5 +92,10 @@ Web_info = LlmAgent(
         "5. Return {web_info_output} as a single string suitable for content generation.\n"
         "6. Avoid repeating searches for the same query in the same session if possible."
     ),
-    tools=[google_search]
+    before_agent_callback=start_agent_span,
+    after_agent_callback=end_agent_span,
+    before_model_callback=trim_history,
+    after_model_callback=[record_prompt_tokens, record_llm_call],
+    tools=[google_search],
+    output_key="web_info_output"
 )
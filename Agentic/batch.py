@@ -0,0 +1,54 @@
+"""
+Bulk campaign generation from a JSONL or CSV file of fully specified problem_configs.
+
+Run from the Agentic directory:
+
+    python batch.py campaigns.jsonl --output results.jsonl --concurrency 4
+
+Each record is generated without requirement gathering and its result is appended to the output
+as one JSON line as soon as it finishes. Running the same command again after an interruption
+skips the items that already succeeded (--restart starts the output over).
+"""
+import sys
+import asyncio
+import argparse
+from dotenv import load_dotenv
+
+# Load the .env file before any module reads its configuration
+load_dotenv()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate posts and images for every problem_config in a batch file.")
+    parser.add_argument("input", help="JSONL or CSV file of problem_config records")
+    parser.add_argument("--output", "-o", help="results JSONL, also the checkpoint (default: <input>.results.jsonl)")
+    parser.add_argument("--concurrency", "-c", type=int, default=None, help="items generated at once (default: BATCH_CONCURRENCY)")
+    parser.add_argument("--restart", action="store_true", help="ignore earlier results in the output and run every item")
+    return parser.parse_args(argv)
+
+async def main(args) -> int:
+    from logger_config import setup_logger, shutdown_logging
+    from utils.batch import BATCH_CONCURRENCY, BatchRunner, read_records, run_batch
+
+    logging = setup_logger("orion_logs")
+    output = args.output or f"{args.input.rsplit('.', 1)[0]}.results.jsonl"
+    records = read_records(args.input)
+    runner = BatchRunner(logging=logging, concurrency=args.concurrency or BATCH_CONCURRENCY)
+
+    counts = {"success": 0, "error": 0}
+    try:
+        async for result in run_batch(runner, records, output, resume=not args.restart):
+            counts[result["status"]] += 1
+            if result["status"] == "success":
+                detail = result.get("image_url") or (result.get("final_post") or "")[:60]
+            else:
+                detail = result.get("error")
+            print(f"[{sum(counts.values())}] {result['id']}: {result['status']} - {detail}")
+    finally:
+        shutdown_logging()
+
+    skipped = len(records) - sum(counts.values())
+    print(f"\n✅ {counts['success']} succeeded, ❌ {counts['error']} failed, ⏭️ {skipped} already done -> {output}")
+    return 1 if counts["error"] else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,214 @@
+"""
+Local stand-ins for Gemini, so the app can be exercised without network access or quota.
+
+    FakeLlm           replaces the model of every ADK agent. Responses come from a
+                      per-agent script: a list of tool calls to make, then a final text.
+    FakeGenaiClient   replaces the shared google-genai client used by image_creator
+                      and returns canned PNG bytes.
+
+Both sleep for a configurable latency (with jitter) so concurrency behaves like
+it would against the real API.
+"""
+import io
+import random
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+from PIL import Image, ImageDraw
+from google.genai import types
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools import AgentTool
+
+# Placeholder in scripted tool arguments: replaced with the result of the previous tool call
+LAST_RESULT = "$last_result"
+
+SAMPLE_POST = (
+    "Clean water changes everything. This month our volunteers installed 12 new wells, "
+    "bringing safe drinking water to more than 3,000 families. #CleanWater #Impact"
+)
+
+@dataclass
+class Script:
+    """ What one agent does in a turn: make these tool calls in order, then answer with final. """
+    final: str = "Done."
+    calls: List[Tuple[str, Dict[str, Any]]] = field(default_factory=list)
+
+SCENARIOS: Dict[str, Dict[str, Script]] = {
+    # Plain conversation, one model call
+    "chat": {
+        "Base_agent": Script(final="Hi! I can help you write impact posts and create visuals."),
+    },
+    # Web info + image generation through the AgentTools, image checked by image_checker
+    "image": {
+        "Base_agent": Script(
+            calls=[
+                ("Web_info", {"request": "Background facts for a clean water flyer"}),
+                ("image_generation_agent", {"request": "Create the flyer visual"}),
+            ],
+            final='{"generated_image": true}',
+        ),
+        "Web_info": Script(final="Summary: 2 billion people lack safe drinking water. Sources: who.int"),
+        "image_generation_agent": Script(
+            calls=[
+                ("image_creator", {"text": "Clean water for 3,000 families", "style": "cheerful"}),
+                ("image_checker", {"image_path": LAST_RESULT, "narrative": "clean water", "allow_text": True}),
+            ],
+            final='{"generated_image": True}',
+        ),
+    },
+    # Flyer with copy and a visual: web info, then text and image in parallel (Content_Agent)
+    "mixed": {
+        "Base_agent": Script(calls=[
+            ("Web_info", {"request": "Background facts for a clean water flyer"}),
+            ("transfer_to_agent", {"agent_name": "Content_Agent"}),
+        ]),
+        "Web_info": Script(final="Summary: 2 billion people lack safe drinking water. Sources: who.int"),
+        "Text_generator": Script(final=SAMPLE_POST),
+        "Refine_agent": Script(final="Mention the number of volunteers."),
+        "Refactor_agent": Script(final=SAMPLE_POST),
+        "image_generation_agent": Script(
+            calls=[
+                ("image_creator", {"text": "Clean water for 3,000 families", "style": "cheerful"}),
+                ("image_checker", {"image_path": LAST_RESULT, "narrative": "clean water", "allow_text": True}),
+            ],
+            final='{"generated_image": True}',
+        ),
+    },
+    # Hand-off to the Orchestrator for text generation and refinement
+    "text": {
+        "Base_agent": Script(calls=[("transfer_to_agent", {"agent_name": "Orchestrator_Agent"})]),
+        "Text_generator": Script(final=SAMPLE_POST),
+        "Refine_agent": Script(final="Mention the number of volunteers."),
+        "Refactor_agent": Script(final=SAMPLE_POST),
+    },
+}
+
+def make_png(width: int = 768, height: int = 768, seed: int = 7) -> bytes:
+    """ A sharp, photo-like test image (shapes over noise) that passes the blur check. """
+    rng = random.Random(seed)
+    image = Image.effect_noise((width, height), 40).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = rng.randrange(width), rng.randrange(height)
+        size = rng.randrange(20, 160)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        draw.ellipse((x, y, x + size, y + size), fill=color)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+async def _sleep(latency: float, jitter: float):
+    if latency > 0:
+        await asyncio.sleep(max(0.0, random.uniform(latency * (1 - jitter), latency * (1 + jitter))))
+
+def estimate_prompt_tokens(llm_request) -> int:
+    """ About 4 characters per token over the instruction and history, so prompt size tracks the real request. """
+    chars = len(str(llm_request.config.system_instruction or "")) if llm_request.config else 0
+    for content in llm_request.contents or []:
+        chars += sum(len(part.text or "") + len(str(part.function_call or "")) + len(str(part.function_response or "")) for part in content.parts or [])
+    return chars // 4
+
+class FakeLlm(BaseLlm):
+    """ Scripted model: replays the agent's Script, counting the tool results already in this turn. """
+
+    script: Script = Script()
+    latency: float = 0.2
+    jitter: float = 0.25
+    tokens: int = 50  # completion tokens per response
+
+    def _turn_progress(self, contents: List[types.Content]) -> Tuple[int, Any]:
+        """ Number of tool results since the last user message, and the latest result. """
+        calls_done = 0
+        last_result = None
+        for content in contents:
+            for part in content.parts or []:
+                if content.role == "user" and part.text:
+                    calls_done = 0
+                    last_result = None
+                elif part.function_response:
+                    calls_done += 1
+                    response = part.function_response.response or {}
+                    last_result = response.get("result", response)
+        return calls_done, last_result
+
+    async def generate_content_async(self, llm_request, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        await _sleep(self.latency, self.jitter)
+        calls_done, last_result = self._turn_progress(llm_request.contents or [])
+
+        if calls_done < len(self.script.calls):
+            name, args = self.script.calls[calls_done]
+            args = {key: (last_result if value == LAST_RESULT else value) for key, value in args.items()}
+            part = types.Part(function_call=types.FunctionCall(name=name, args=args))
+        else:
+            part = types.Part(text=self.script.final)
+
+        prompt_tokens = estimate_prompt_tokens(llm_request)
+        yield LlmResponse(
+            content=types.Content(role="model", parts=[part]),
+            usage_metadata=types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens, candidates_token_count=self.tokens, total_token_count=prompt_tokens + self.tokens
+            ),
+        )
+
+class _FakeModels:
+    def __init__(self, image_bytes: bytes, latency: float, jitter: float):
+        self.image_bytes = image_bytes
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+
+    def _response(self) -> types.GenerateContentResponse:
+        self.calls += 1
+        return types.GenerateContentResponse(candidates=[types.Candidate(content=types.Content(role="model", parts=[
+            types.Part(text="Here is your image."),
+            types.Part(inline_data=types.Blob(mime_type="image/png", data=self.image_bytes)),
+        ]))])
+
+    async def generate_content(self, model: str, contents: Any, config: Any = None) -> types.GenerateContentResponse:
+        await _sleep(self.latency, self.jitter)
+        return self._response()
+
+class _FakeSyncModels(_FakeModels):
+    def generate_content(self, model: str, contents: Any, config: Any = None) -> types.GenerateContentResponse:
+        return self._response()
+
+class _FakeAio:
+    def __init__(self, models: _FakeModels):
+        self.models = models
+
+class FakeGenaiClient:
+    """ Just enough of genai.Client for image generation: client.aio.models.generate_content returns a PNG. """
+
+    def __init__(self, image_bytes: Optional[bytes] = None, latency: float = 1.0, jitter: float = 0.25):
+        image_bytes = image_bytes or make_png()
+        self.aio = _FakeAio(_FakeModels(image_bytes, latency, jitter))
+        self.models = _FakeSyncModels(image_bytes, latency, jitter)
+
+def iter_agents(root):
+    """ Every agent reachable from root, including agents wrapped in AgentTool. """
+    seen = set()
+    stack = [root]
+    while stack:
+        agent = stack.pop()
+        if id(agent) in seen:
+            continue
+        seen.add(id(agent))
+        yield agent
+        stack.extend(agent.sub_agents)
+        stack.extend(tool.agent for tool in getattr(agent, "tools", []) if isinstance(tool, AgentTool))
+
+def install_fake_backend(root_agent, scenario: str = "image", llm_latency: float = 0.2, image_latency: float = 1.0, jitter: float = 0.25) -> FakeGenaiClient:
+    """ Point every model-backed agent under root_agent and the image tool at the fakes. """
+    from tools import genai_client
+
+    scripts = SCENARIOS[scenario]
+    for agent in iter_agents(root_agent):
+        if hasattr(agent, "model"):
+            # Keep the Gemini model name: built-in tools such as google_search check it
+            model_name = getattr(agent.model, "model", agent.model) or "gemini-2.5-flash"
+            agent.model = FakeLlm(model=model_name, script=scripts.get(agent.name, Script()), latency=llm_latency, jitter=jitter)
+
+    client = FakeGenaiClient(latency=image_latency, jitter=jitter)
+    genai_client._client = client
+    return client
@@ -0,0 +1,81 @@
+"""
+Import-time profile of the app.
+
+Run from the Agentic directory:
+
+    python -m benchmarks.import_profile [--top 25]
+
+Measures, each in a fresh interpreter:
+    - 'import main'   what uvicorn (and every --reload cycle) waits for before serving
+    - warm-up         utils.warm_up.warm_up: the agent stack loaded by the lifespan hook
+and lists the slowest modules reported by python -X importtime.
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from typing import Dict, List, Tuple
+
+AGENTIC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run_python(code: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    env = {**os.environ, "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "offline-profile"), "WARM_UP": "lazy"}
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(command, cwd=AGENTIC_DIR, env=env, capture_output=True, text=True, check=True)
+
+def parse_importtime(stderr: str) -> List[Tuple[str, float, float]]:
+    """ (module, self seconds, cumulative seconds) for every 'import time:' line. """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            rows.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6))
+        except ValueError:
+            continue
+    return rows
+
+def profile(top: int) -> Dict[str, object]:
+    timed_import = run_python(
+        "import time, json; started = time.perf_counter(); import main; "
+        "print(json.dumps({'import_main_s': time.perf_counter() - started}))"
+    )
+    report = json.loads(timed_import.stdout.strip().splitlines()[-1])
+
+    timed_warm_up = run_python(
+        "import json, main; from utils.warm_up import warm_up; "
+        "print(json.dumps(warm_up(main.logging)))"
+    )
+    report["warm_up_s"] = json.loads(timed_warm_up.stdout.strip().splitlines()[-1])
+
+    rows = parse_importtime(run_python("import main", importtime=True).stderr)
+    report["slowest_imports"] = [
+        {"module": name, "self_s": round(self_s, 4), "cumulative_s": round(cumulative_s, 4)}
+        for name, self_s, cumulative_s in sorted(rows, key=lambda row: -row[2])[:top]
+    ]
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report import and warm-up times of the app.")
+    parser.add_argument("--top", type=int, default=25, help="number of slowest imports to list")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = profile(args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"import main        {report['import_main_s']:.3f} s   (time before the server can answer)")
+    print(f"warm-up (lifespan) {report['warm_up_s'].get('total', 0.0):.3f} s")
+    for name, seconds in report["warm_up_s"].items():
+        if name != "total":
+            print(f"    {name:<30} {seconds:.3f} s")
+    print("\nSlowest imports during 'import main' (cumulative):")
+    for row in report["slowest_imports"]:
+        print(f"    {row['module']:<60} {row['cumulative_s']:.4f} s  (self {row['self_s']:.4f} s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Offline load test for /agent/query (or /agent/stream) with the fake Gemini backend.
+
+Run from the Agentic directory:
+
+    python -m benchmarks.load_test --scenario image --requests 200 --concurrency 20
+
+Reports requests/s, latency percentiles, errors and memory use, plus the
+per-agent and per-tool p95s recorded by utils.metrics.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import tracemalloc
+from typing import Dict, List
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the agent API against a fake Gemini backend.")
+    parser.add_argument("--scenario", default="image", choices=["chat", "image", "text", "mixed"])
+    parser.add_argument("--endpoint", default="query", choices=["query", "stream"])
+    parser.add_argument("--requests", type=int, default=100, help="total number of requests")
+    parser.add_argument("--concurrency", type=int, default=10, help="requests in flight at once")
+    parser.add_argument("--sessions", type=int, default=0, help="distinct sessions to spread requests over (0 = one per request)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per fake model call")
+    parser.add_argument("--image-latency", type=float, default=1.0, help="seconds per fake image generation")
+    parser.add_argument("--jitter", type=float, default=0.25, help="relative latency jitter")
+    parser.add_argument("--with-caches", action="store_true", help="keep the web info and image caches enabled")
+    parser.add_argument("--tracemalloc", action="store_true", help="also report the Python heap peak (slower)")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    return parser.parse_args(argv)
+
+def configure_environment(args):
+    """ Must run before main is imported: these are read at import time. """
+    workdir = tempfile.mkdtemp(prefix="orion-bench-")
+    os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+    os.environ.setdefault("APP_NAME", "orion_benchmark")
+    os.environ.setdefault("SESSION_BACKEND", "memory")
+    # Load the agent stack during startup so the first requests do not include it
+    os.environ.setdefault("WARM_UP", "blocking")
+    os.environ.setdefault("ARTIFACT_DIR", os.path.join(workdir, "artifacts"))
+    os.environ.setdefault("IMAGE_CACHE_DIR", os.path.join(workdir, "image_cache"))
+    os.environ.setdefault("LOG_SAMPLE_RATES", "orion_logs=0.01")
+    os.environ.setdefault("MAX_CONCURRENT_SESSIONS", str(max(args.concurrency, 1)))
+    # The fakes have no quota: measure the app, not the Gemini request-rate budgets (set them to test the limiter)
+    for budget in ("TEXT", "SEARCH", "IMAGE"):
+        os.environ.setdefault(f"GEMINI_{budget}_RPM", "0")
+    if not args.with_caches:
+        os.environ["IMAGE_CACHE_ENABLED"] = "false"
+        os.environ["WEB_INFO_CACHE_TTL"] = "0"
+
+async def run_load(app, args) -> Dict[str, object]:
+    import httpx
+
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    counter = iter(range(args.requests))
+
+    async def worker(client):
+        for i in counter:
+            session = f"bench-{i % args.sessions if args.sessions else i}"
+            payload = {"prompt": "Create a flyer about our clean water project", "session_id": session}
+            started = time.perf_counter()
+            try:
+                if args.endpoint == "stream":
+                    async with client.stream("POST", "/agent/stream", json=payload) as response:
+                        body = "".join([chunk async for chunk in response.aiter_text()])
+                    ok = response.status_code == 200 and "event: final" in body
+                    status = response.status_code if ok else "error_event"
+                else:
+                    response = await client.post("/agent/query", json=payload)
+                    ok = response.status_code == 200
+                    status = response.status_code
+            except Exception as e:
+                ok, status = False, type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(client) for _ in range(args.concurrency)))
+            elapsed = time.perf_counter() - started
+
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_s": round(args.requests / elapsed, 2) if elapsed else 0.0,
+        "latency_s": {f"p{int(q * 100)}": round(percentile(latencies, q), 4) for q in (0.5, 0.95, 0.99)},
+        "latency_max_s": round(max(latencies, default=0.0), 4),
+        "errors": errors,
+    }
+
+def stage_breakdown() -> Dict[str, float]:
+    """ p95 per agent and tool, from the in-process metrics. """
+    from utils.metrics import AGENT_LATENCY, TOOL_LATENCY, FUNCTION_LATENCY
+
+    breakdown = {}
+    for kind, histogram in (("agent", AGENT_LATENCY), ("tool", TOOL_LATENCY), ("function", FUNCTION_LATENCY)):
+        for labels in histogram.label_sets():
+            name = next(iter(labels.values()))
+            breakdown[f"{kind}:{name}"] = round(histogram.quantiles(**labels).get(0.95, 0.0), 4)
+    return breakdown
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment(args)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    rss_before = rss_mb()
+
+    import main as app_module
+    from agents import Base
+    from benchmarks.fake_backend import install_fake_backend
+
+    install_fake_backend(Base, args.scenario, args.llm_latency, args.image_latency, args.jitter)
+    report = asyncio.run(run_load(app_module.app, args))
+
+    report["scenario"] = args.scenario
+    report["endpoint"] = args.endpoint
+    report["rss_peak_mb"] = round(rss_mb(), 1)
+    report["rss_growth_mb"] = round(rss_mb() - rss_before, 1)
+    if args.tracemalloc:
+        report["heap_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+        tracemalloc.stop()
+    report["p95_by_stage_s"] = stage_breakdown()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"\nScenario '{report['scenario']}' on /agent/{report['endpoint']}: "
+          f"{report['requests']} requests, concurrency {report['concurrency']}")
+    print(f"  throughput   {report['requests_per_s']} req/s over {report['elapsed_s']} s")
+    print(f"  latency      p50 {report['latency_s']['p50']} s | p95 {report['latency_s']['p95']} s | "
+          f"p99 {report['latency_s']['p99']} s | max {report['latency_max_s']} s")
+    print(f"  errors       {report['errors'] or 'none'}")
+    print(f"  memory       RSS peak {report['rss_peak_mb']} MB (+{report['rss_growth_mb']} MB during run)"
+          + (f", heap peak {report['heap_peak_mb']} MB" if "heap_peak_mb" in report else ""))
+    print("  p95 by stage")
+    for stage, value in sorted(report["p95_by_stage_s"].items(), key=lambda item: -item[1]):
+        print(f"    {stage:<45} {value} s")
+
+if __name__ == "__main__":
+    main()
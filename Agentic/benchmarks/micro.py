@@ -0,0 +1,144 @@
+"""
+Micro-benchmarks for the hot helpers on the request path.
+
+Run from the Agentic directory:
+
+    python -m benchmarks.micro                          # print timings
+    python -m benchmarks.micro --save baseline.json     # record a baseline
+    python -m benchmarks.micro --compare baseline.json  # exit 1 if any p50 regressed
+
+No network access or API key is needed.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import contextlib
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("GOOGLE_API_KEY", "offline-benchmark")
+
+from PIL import Image, ImageDraw
+from benchmarks.fake_backend import make_png, SAMPLE_POST
+from utils.json_extractor import extract_json_object
+from tools.image_checker import image_checker
+from tools.problem_state_manager import update_problem_config_tool, update_problem_config_bulk_tool
+from utils.session_manager import default_session_state
+
+def bench(func: Callable[[], object], iterations: int, warmup: int = 3) -> Dict[str, float]:
+    for _ in range(warmup):
+        func()
+    timings: List[float] = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        "iterations": iterations,
+        "mean_us": statistics.fmean(timings) * 1e6,
+        "p50_us": timings[len(timings) // 2] * 1e6,
+        "p95_us": timings[min(len(timings) - 1, int(0.95 * len(timings)))] * 1e6,
+    }
+
+def make_images(directory: str) -> Dict[str, str]:
+    """ A sharp photo-like PNG, a blurry one and one with a text banner. """
+    photo = os.path.join(directory, "photo.png")
+    with open(photo, "wb") as f:
+        f.write(make_png(1024, 1024))
+
+    blurry = os.path.join(directory, "blurry.png")
+    Image.new("RGB", (1024, 1024), (120, 160, 200)).save(blurry)
+
+    text = os.path.join(directory, "text.png")
+    image = Image.open(photo).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 1024, 160), fill="white")
+    for row in range(3):
+        draw.text((20, 20 + row * 45), "CLEAN WATER FOR 3,000 FAMILIES - JOIN US THIS SATURDAY", fill="black")
+    image.save(text)
+    return {"photo": photo, "blurry": blurry, "text": text}
+
+def agent_responses() -> Dict[str, str]:
+    """ Typical final responses handed to the JSON extraction in agent_query. """
+    return {
+        "fenced": f'Here is your result:\n```json\n{{"generated_image": true, "final_post": {json.dumps(SAMPLE_POST)}}}\n```',
+        "python_literal": "{'generated_image': True}",
+        "prose_only": SAMPLE_POST * 20,
+        "long_with_object": ("Refined draft follows. " + SAMPLE_POST) * 200 + '\n{"final_post": "done"}',
+        "unclosed_brace": 'Post about {topic and more. ' + SAMPLE_POST + ' Result: {"generated_image": true}',
+    }
+
+def run(iterations: int) -> Dict[str, Dict[str, float]]:
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        images = make_images(directory)
+        image_iterations = max(5, iterations // 20)
+        results["image_checker[photo, text allowed]"] = bench(lambda: image_checker(images["photo"], "", True), image_iterations)
+        results["image_checker[photo, no text]"] = bench(lambda: image_checker(images["photo"], "", False), image_iterations)
+        results["image_checker[blurry]"] = bench(lambda: image_checker(images["blurry"], "", False), image_iterations)
+        results["image_checker[text banner, no text]"] = bench(lambda: image_checker(images["text"], "", False), image_iterations)
+
+    for name, response in agent_responses().items():
+        results[f"extract_json_object[{name}]"] = bench(lambda: extract_json_object(response), iterations)
+
+    tool_context = SimpleNamespace(state=default_session_state())
+    results["update_problem_config_tool[str]"] = bench(
+        lambda: update_problem_config_tool("title", "Clean water for all", tool_context), iterations)
+    results["update_problem_config_tool[list]"] = bench(
+        lambda: update_problem_config_tool("hashtags", "#CleanWater, #Impact, #Volunteers", tool_context), iterations)
+    results["update_problem_config_bulk_tool[5 keys]"] = bench(
+        lambda: update_problem_config_bulk_tool(
+            {"title": "Clean water", "tone": "hopeful", "post_type": "flyer", "keywords": ["water", "wells"], "language": "English"},
+            tool_context,
+        ), iterations)
+    return results
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """ Names of benchmarks whose p50 is more than tolerance slower than the baseline. """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous and result["p50_us"] > previous["p50_us"] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {previous['p50_us']:.1f} us -> {result['p50_us']:.1f} us")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark image_checker, JSON extraction and problem_config updates.")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p50 slowdown")
+    args = parser.parse_args(argv)
+
+    # The tools print progress on every call; keep the report readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(args.iterations)
+
+    print(f"{'benchmark':<45} {'iters':>6} {'mean us':>11} {'p50 us':>11} {'p95 us':>11}")
+    for name, result in results.items():
+        print(f"{name:<45} {result['iterations']:>6} {result['mean_us']:>11.1f} {result['p50_us']:>11.1f} {result['p95_us']:>11.1f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+if __name__ == "__main__":
+    main()
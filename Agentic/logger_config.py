@@ -1,6 +1,10 @@
+import atexit
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from utils.metrics import metrics
 
 # Optional: Use colorlog for colored console output
 try:
@@ -12,10 +16,120 @@ except ImportError:
 LOG_DIR = "logs"
 os.makedirs(LOG_DIR, exist_ok=True)
 
-def setup_logger(name: str) -> logging.Logger:
+# Hand records to a background writer thread instead of writing on the caller's thread
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() in ("1", "true", "yes")
+# Records waiting for the writer thread; further records are dropped (and counted) when full
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10_000))
+# Messages longer than this are cut down before they are queued
+LOG_MAX_PAYLOAD = int(os.getenv("LOG_MAX_PAYLOAD", 2_000))
+# Per-logger sampling of DEBUG/INFO records, e.g. "orion_logs=0.25,other=1"
+LOG_SAMPLE_RATES = {
+    name.strip(): float(rate)
+    for name, rate in (
+        item.split("=", 1) for item in os.getenv("LOG_SAMPLE_RATES", "").split(",") if "=" in item
+    )
+}
+
+_listeners = []   # writer threads running
+_stopped = []     # writer threads stopped by shutdown_logging, restarted by start_logging
+
+class TruncatingFilter(logging.Filter):
+    """ Cuts oversized messages down to max_chars, noting how much was dropped. """
+
+    def __init__(self, max_chars: int = LOG_MAX_PAYLOAD):
+        super().__init__()
+        self.max_chars = max_chars
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "truncated", False):
+            # Already cut down by the filter of another handler
+            return True
+        message = record.getMessage()
+        if len(message) > self.max_chars:
+            record.msg = f"{message[:self.max_chars]}... [{len(message) - self.max_chars} chars truncated]"
+            record.args = None
+            record.truncated = True
+        return True
+
+class SamplingFilter(logging.Filter):
+    """ Keeps only a fraction of records below WARNING; warnings and errors always pass. """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        # Decided once per record, so every handler it reaches keeps or drops it alike
+        if not hasattr(record, "sampled"):
+            record.sampled = random.random() < self.rate
+        return record.sampled
+
+class DroppingQueueHandler(QueueHandler):
+    """ QueueHandler that never blocks the caller: when the queue is full the record is dropped. """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def summarize_content(content, max_chars: int = 200) -> str:
+    """
+    Short, log-friendly description of a google.genai Content: text is clipped,
+    inline data is reduced to its type and size, tool calls to their names.
+    """
+    if content is None:
+        return "None"
+    parts = getattr(content, "parts", None) or []
+    summary = []
+    for part in parts:
+        if getattr(part, "text", None):
+            text = part.text.replace("\n", " ")
+            summary.append(repr(text if len(text) <= max_chars else f"{text[:max_chars]}... (+{len(text) - max_chars} chars)"))
+        elif getattr(part, "inline_data", None):
+            data = part.inline_data.data or b""
+            summary.append(f"<{part.inline_data.mime_type} {len(data)} bytes>")
+        elif getattr(part, "function_call", None):
+            summary.append(f"call:{part.function_call.name}")
+        elif getattr(part, "function_response", None):
+            summary.append(f"result:{part.function_response.name}")
+    return f"{getattr(content, 'role', None)}: [{', '.join(summary)}]"
+
+def shutdown_logging():
+    """ Flush queued records and stop the background writer threads. """
+    while _listeners:
+        listener = _listeners.pop()
+        listener.stop()
+        _stopped.append(listener)
+
+def start_logging():
+    """ Restart writer threads stopped by shutdown_logging (an app restarted in the same process, --reload, tests). """
+    while _stopped:
+        listener = _stopped.pop()
+        listener.start()
+        _listeners.append(listener)
+
+atexit.register(shutdown_logging)
+
+def setup_logger(name: str, async_mode: bool = None, sample_rate: float = None, max_payload: int = None) -> logging.Logger:
     logger = logging.getLogger(name)
     logger.setLevel(logging.DEBUG)  # Set lowest level to capture all logs
 
+    # Avoid duplicate handlers
+    if logger.handlers:
+        start_logging()
+        return logger
+
+    async_mode = LOG_ASYNC if async_mode is None else async_mode
+    sample_rate = LOG_SAMPLE_RATES.get(name, 1.0) if sample_rate is None else sample_rate
+    max_payload = LOG_MAX_PAYLOAD if max_payload is None else max_payload
+
     # Formatter for file logs
     file_formatter = logging.Formatter(
         '%(asctime)s | %(name)s | %(levelname)s | %(message)s',
@@ -49,9 +163,28 @@ def setup_logger(name: str) -> logging.Logger:
     console_handler.setFormatter(console_formatter)
     console_handler.setLevel(logging.INFO)
 
-    # Avoid duplicate handlers
-    if not logger.handlers:
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
+    # Sampling and truncation run on the caller's thread, before anything is queued or written.
+    # They go on the handlers, not the logger, so records of child loggers (orion_logs.image_agent) pass them too
+    filters = [SamplingFilter(sample_rate)] if sample_rate < 1.0 else []
+    filters.append(TruncatingFilter(max_payload))
+
+    if async_mode:
+        queue_handler = DroppingQueueHandler(queue.Queue(maxsize=LOG_QUEUE_SIZE))
+        for log_filter in filters:
+            queue_handler.addFilter(log_filter)
+        listener = QueueListener(queue_handler.queue, file_handler, console_handler, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+        logger.addHandler(queue_handler)
+        # orion_log_dropped_records{logger=...} and orion_log_queued_records{logger=...}
+        metrics.register_stats("orion_log", "logger", name, lambda: {
+            "dropped_records": queue_handler.dropped,
+            "queued_records": queue_handler.queue.qsize(),
+        })
+    else:
+        for handler in (file_handler, console_handler):
+            for log_filter in filters:
+                handler.addFilter(log_filter)
+            logger.addHandler(handler)
 
-    return logger
\ No newline at end of file
+    return logger
@@ -1,90 +1,92 @@
 # Import necessary libraries
 import os
-import regex
 import sys
 import json
-import base64
-from fastapi import FastAPI, HTTPException, UploadFile, File
+import asyncio
+from dotenv import load_dotenv
+
+# Load the .env file before any module reads its configuration
+load_dotenv()
+
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from contextlib import asynccontextmanager
 from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any, Generator
-from dotenv import load_dotenv
-from logger_config import setup_logger
-from utils import call_agent_query_async, create_session, retrieve_session, create_runner
-from google.adk.sessions import InMemorySessionService
-
-# Importing the agents
-from agents import Base
-
-# Load the .env file
-load_dotenv()
+from logger_config import setup_logger, start_logging, shutdown_logging
+from utils.json_extractor import extract_json_object
+from utils.artifact_store import ArtifactStore, RangeNotSatisfiable, get_artifact_store, parse_range, iter_file, ARTIFACT_SWEEP_INTERVAL
+from utils.metrics import metrics
+from utils.result_cache import result_cache_bypass, canonical_hash
+from utils.single_flight import SingleFlight
+from utils.job_queue import JobQueue, QueueFullError
+from utils.rate_limiter import is_rate_limit_error, GEMINI_BACKOFF_MAX
+# The agents, google.adk and the image stack are imported by init_agent_runtime (see WARM_UP)
 
 # Default User
 APP_NAME = os.getenv("APP_NAME")
 USER_ID = "user_1"
 SESSION_ID = "session_001"
 
+# Upper bound on sessions running through the agent pipeline at the same time
+MAX_CONCURRENT_SESSIONS = int(os.getenv("MAX_CONCURRENT_SESSIONS", 32))
+
+# Background jobs (POST /jobs): worker count, queued jobs before answering 429, seconds results are kept
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 4))
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", 100))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", 3600))
+
 # Configure logging
 logging = setup_logger("orion_logs")
 
-# Session configuration
-session_service_memory = InMemorySessionService()
+# Generated images are served from here
+artifact_store = get_artifact_store()
+
+# Session configuration: "memory" (single process) or "sqlite" (persistent, shareable across workers)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").lower()
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+# Events loaded per turn from the sqlite backend (0 = all); model requests are trimmed further by CONTEXT_HISTORY_MESSAGES
+SESSION_MAX_EVENTS = int(os.getenv("SESSION_MAX_EVENTS", 0))
 
-session_service = session_service_memory
+# When the agent stack is loaded:
+#   "blocking"   - during startup, before the server accepts requests (production)
+#   "background" - right after startup; the server answers at once and agent requests wait for it
+#   "lazy"       - on the first agent request (fastest --reload cycles)
+WARM_UP = os.getenv("WARM_UP", "background").lower()
+
+def create_session_service():
+    if SESSION_BACKEND == "sqlite":
+        from utils.sqlite_session_service import SqliteSessionService
+        return SqliteSessionService(db_path=SESSION_DB_PATH, max_events=SESSION_MAX_EVENTS)
+    from google.adk.sessions import InMemorySessionService
+    return InMemorySessionService()
 
 # ------------------ Global runner ------------------
+session_service = None
 runner = None
+session_manager = None
+_runtime_task = None
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    # ------------------ Initialize session and runner ------------------
-    global runner
-    session = await retrieve_session(
+async def init_agent_runtime():
+    """ Import the agent stack off the event loop, then build the session manager and runner. """
+    global session_service, runner, session_manager
+    from utils.warm_up import warm_up
+    await asyncio.to_thread(warm_up, logging)
+
+    from agents import Base
+    from utils import create_runner, SessionManager
+
+    session_service = create_session_service()
+    session_manager = SessionManager(
         session_service=session_service,
         app_name=APP_NAME,
-        user_id=USER_ID,
-        session_id=SESSION_ID,
-        logging=logging
+        logging=logging,
+        max_concurrent_sessions=MAX_CONCURRENT_SESSIONS
     )
 
-    if not session:
-        session = await create_session(
-            session_service=session_service,
-            app_name=APP_NAME,
-            user_id=USER_ID,
-            session_id=SESSION_ID,
-            logging=logging,
-            state={
-            "problem_config":   {    
-                # Core content details
-                "post_type": None,            # e.g., 'impact_story', 'blog', 'flyer', 'social_awareness', 'etc'
-                "title": None,                # Optional title for post
-                "summary": None,              # Short summary or description
-                "keywords": None,             # List of relevant keywords or hashtags
-                
-                # Content format & style
-                "tone": "motivational",                 # e.g., 'formal', 'casual', 'emotional', 'motivational'
-                "length": "medium",               # e.g., 'short', 'medium', 'long'
-                "language": "english",             # Default language
-                "style": None,
-
-                # Media & references
-                "external_reference_links": None,       # URLs for references or sources
-                "hashtags": None,
-
-                # Target & audience
-                "target_audience": None,      # e.g., 'students', 'general public', 'environment activists'
-                
-                # Optional constraints
-                "special_requirements": None  # e.g., 'include statistics', 'cite sources', 'focus on local region'
-            },
-            "generated_post": None,
-            "final_image": None,
-            "final_post": None,
-            "web_info_output": None, 
-        }
-    )
+    # Keep the default session around for clients that do not send ids
+    await session_manager.get_or_create(USER_ID, SESSION_ID)
 
     runner = await create_runner(
         agent=Base,
@@ -93,13 +95,57 @@ async def lifespan(app: FastAPI):
         logging=logging
     )
 
-    logging.info("Session and runner initialized successfully")
+    logging.info("Session manager and runner initialized successfully")
+
+def _log_runtime_failure(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logging.error(f"Agent runtime initialization failed: {task.exception()}")
+
+def start_agent_runtime() -> asyncio.Task:
+    """ Start initializing the agent runtime unless it is running or done; a failed attempt is retried. """
+    global _runtime_task
+    if _runtime_task is None or (_runtime_task.done() and (_runtime_task.cancelled() or _runtime_task.exception() is not None)):
+        _runtime_task = asyncio.create_task(init_agent_runtime())
+        _runtime_task.add_done_callback(_log_runtime_failure)
+    return _runtime_task
+
+async def ensure_agent_runtime():
+    """ Wait until the runner is ready. """
+    await asyncio.shield(start_agent_runtime())
+
+async def sweep_artifacts():
+    """ Apply the artifact retention limits (ARTIFACT_MAX_AGE, ARTIFACT_MAX_BYTES) every ARTIFACT_SWEEP_INTERVAL seconds. """
+    while True:
+        try:
+            removed = await asyncio.to_thread(artifact_store.sweep)
+            if removed:
+                logging.info(f"Artifact retention removed {removed} artifact(s)")
+        except Exception as e:
+            logging.error(f"Artifact sweep failed: {e}")
+        await asyncio.sleep(ARTIFACT_SWEEP_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The writer threads are stopped on shutdown; a restarted app (tests, --reload) needs them again
+    start_logging()
+    # ------------------ Initialize session manager and runner ------------------
+    if WARM_UP == "blocking":
+        await ensure_agent_runtime()
+    elif WARM_UP == "background":
+        start_agent_runtime()
+    job_queue.start()
+    sweep_task = asyncio.create_task(sweep_artifacts()) if ARTIFACT_SWEEP_INTERVAL > 0 else None
 
     try:
         yield  # the app runs here
     finally:
         # Optional: cleanup if needed
         logging.info("Lifespan ending, cleaning up resources...")
+        if sweep_task:
+            sweep_task.cancel()
+        await job_queue.stop()
+        # Flush queued log records before the process exits
+        shutdown_logging()
 
 # Server configuration
 app = FastAPI(lifespan=lifespan)
@@ -124,53 +170,312 @@ app.add_middleware(
 async def root():
     return {"message": f"Server is running at port: {os.getenv("PORT", 8000)}!"}
 
+# Cleared at the start of every turn so a structured result always belongs to the current turn
+TURN_RESET_STATE = {"final_result": None}
+
     # Request body model
 class PromptRequest(BaseModel):
     prompt: str
+    user_id: str = USER_ID
+    session_id: str = SESSION_ID
+    # Ignore memoized posts/images and generate fresh ones
+    bypass_cache: bool = False
+
+
+def build_query_response(response: str, state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """ Turn the agent's result into the API response, referencing the image artifact when one was generated. """
+    state = state or {}
+
+    # Structured result reported through submit_final_result: no text scanning needed
+    data = state.get("final_result")
+    if data is None:
+        data = extract_json_object(response)
+
+    if data is not None:
+        # 🔹 If generated_image is True, return a reference to the stored image
+        if data.get("generated_image") is True:
+            artifact_id = ArtifactStore.id_from_path(state.get("final_image"))
+            if not artifact_id or artifact_store.info(artifact_id) is None:
+                raise HTTPException(status_code=404, detail="Image file not found")
+            result = {
+                "status": "success",
+                "image_id": artifact_id,
+                "image_url": f"/artifacts/{artifact_id}"
+            }
+            # Platform sizes rendered after generation: {"square": {"webp": url, "jpeg": url}, ...}
+            variants = artifact_store.info(artifact_id)["metadata"].get("variants")
+            if variants:
+                result["variants"] = {
+                    name: {fmt: f"/artifacts/{variant_id}" for fmt, variant_id in formats.items()}
+                    for name, formats in variants.items()
+                }
+            # Text and image generated together (Content_Agent): return both
+            if data.get("final_post"):
+                result["response"] = data["final_post"]
+            return result
+        elif data.get("final_post"):
+            return {"status": "success", "response": data["final_post"]}
+        else:
+            # Handle the case when image generation failed or is not present
+            raise HTTPException(status_code=400, detail="Image was not generated")
+    return {"status": "success", "response": response}
+
+
+# Identical requests of one session running at the same time share one pipeline run
+single_flight = SingleFlight()
+
+# Result state returned with a turn's response
+SHARED_RESULT_KEYS = ("problem_config", "web_info_output", "generated_post", "final_post", "final_image", "final_result")
+
+def query_flight_key(request: PromptRequest) -> str:
+    """
+    Same session, prompt and bypass flag -> same key: a double-submit joins the run already in flight.
+    Scoped to the session, since the answer depends on its history. Sessions with the same finalized
+    problem_config share work at the generation stages instead (utils.result_cache.generating).
+    """
+    return canonical_hash({
+        "prompt": request.prompt,
+        "scope": [request.user_id, request.session_id],
+        "bypass": request.bypass_cache,
+    })
 
+async def run_query(request: PromptRequest) -> Dict[str, Any]:
+    """ One agent turn for the request's session. Returns the response text and the result state. """
+    from utils import call_agent_query_async
+    async with session_manager.acquire(request.user_id, request.session_id):
+        with result_cache_bypass(request.bypass_cache):
+            response = await call_agent_query_async(
+                query=request.prompt,
+                runner=runner,
+                user_id=request.user_id,
+                session_id=request.session_id,
+                logging=logging,
+                state_delta=TURN_RESET_STATE
+            )
+        session = await session_manager.get_or_create(request.user_id, request.session_id)
+    return {
+        "response": response,
+        "state": {key: session.state.get(key) for key in SHARED_RESULT_KEYS},
+    }
+
+async def coalesced_query(request: PromptRequest) -> Dict[str, Any]:
+    """ run_query, shared with identical requests of the same session already in flight. """
+    return await single_flight.do(query_flight_key(request), lambda: run_query(request))
+
+def quota_exhausted(error: Exception) -> HTTPException:
+    """ Gemini kept answering 429 after the limiter's retries: tell the client to come back later. """
+    return HTTPException(
+        status_code=429,
+        detail=f"Model quota exhausted, please retry later: {error}",
+        headers={"Retry-After": str(int(GEMINI_BACKOFF_MAX))}
+    )
 
 @app.post("/agent/query")
 async def agent_query(request: PromptRequest):
     try:
-        response = await call_agent_query_async(
-            query=request.prompt,
-            runner=runner,
-            user_id=USER_ID,
-            session_id=SESSION_ID,
-            logging=logging
-        )
-        match = regex.search(r'```(?:JSON)?\s*(\{.*?\})\s*```', response, regex.DOTALL | regex.IGNORECASE)
-
-        if not match:
-            # Fallback: match any standalone JSON object including nested braces
-            match = regex.search(r'(\{(?:[^{}]|(?0))*\})', response, regex.DOTALL)
-        
-        if match:
-            json_str = match.group(1)
-            json_str = json_str.replace("True", "true").replace("False", "false").replace("None", "null")
-            data = json.loads(json_str)
-
-            # 🔹 If generated_image is True, read image and return binary (base64)
-            if data.get("generated_image") is True:
-                try:
-                    with open(r"C:\Users\lenovo\OneDrive\Desktop\Skillcred\Impact AI\Agentic\output\generated_image.png", "rb") as f:
-                        image_bytes = f.read()
-                        image_b64 = base64.b64encode(image_bytes).decode("utf-8")
-                    
-                    return {
-                        "status": "success",
-                        "image_base64": image_b64
-                    }
-                except FileNotFoundError:
-                    raise HTTPException(status_code=404, detail="Image file not found")
-            else:
-                # Handle the case when image generation failed or is not present
-                raise HTTPException(status_code=400, detail="Image was not generated")       
-        return {"status": "success", "response": response}
+        await ensure_agent_runtime()
+        result = await coalesced_query(request)
+        return build_query_response(result["response"], result["state"])
     except Exception as e:
         logging.error(f"Agent query failed: {e}")
+        if is_rate_limit_error(e):
+            raise quota_exhausted(e)
         raise HTTPException(status_code=500, detail=str(e))
 
+
+async def run_job(request: PromptRequest) -> Dict[str, Any]:
+    """ Worker side of POST /jobs: the same turn /agent/query runs. """
+    await ensure_agent_runtime()
+    result = await coalesced_query(request)
+    return build_query_response(result["response"], result["state"])
+
+# Long generations run here instead of holding the HTTP connection open
+job_queue = JobQueue(run_job, logging=logging, workers=JOB_WORKERS, max_size=JOB_QUEUE_SIZE, result_ttl=JOB_RESULT_TTL)
+
+@app.post("/jobs", status_code=202)
+async def submit_job(request: PromptRequest):
+    try:
+        job = job_queue.submit(request)
+    except QueueFullError as e:
+        return JSONResponse(
+            status_code=429,
+            content={"status": "rejected", "detail": str(e), "retry_after": e.retry_after},
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "position": job_queue.position(job),
+    }
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    data = job.to_dict()
+    if job.status == "queued":
+        data["position"] = job_queue.position(job)
+    return data
+
+
+# ------------------ Batch generation ------------------
+batch_runner = None
+# Batches being generated right now, by batch id (one run per batch file at a time)
+active_batches = set()
+
+def get_batch_runner():
+    """ The batch runner, created on first use (it imports the agent stack). """
+    global batch_runner
+    if batch_runner is None:
+        from utils.batch import BatchRunner
+        batch_runner = BatchRunner(logging=logging, app_name=f"{APP_NAME}_batch")
+    return batch_runner
+
+def batch_line(result: Dict[str, Any]) -> str:
+    """ One streamed result; the local image path stays in the server's copy. """
+    return json.dumps({key: value for key, value in result.items() if key != "image_path"}, default=str) + "\n"
+
+@app.post("/batch")
+async def run_batch_file(file: UploadFile = File(...), resume: bool = True):
+    """
+    Generate every problem_config in an uploaded JSONL or CSV file and stream the results as JSONL.
+    The batch id (X-Batch-Id) is derived from the file content: uploading the same file again after an
+    interruption replays the finished items (marked "resumed") and only generates the rest.
+    """
+    from utils.batch import parse_records, read_checkpoint, run_batch, batch_output_path
+    try:
+        data = (await file.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Batch file must be UTF-8 encoded")
+    records = parse_records(data, "csv" if (file.filename or "").lower().endswith(".csv") else "jsonl")
+    if not records:
+        raise HTTPException(status_code=400, detail="Batch file has no records")
+
+    batch_id = canonical_hash(data)[:16]
+    if batch_id in active_batches:
+        raise HTTPException(status_code=409, detail=f"Batch {batch_id} is already running")
+    output = batch_output_path(batch_id)
+
+    async def result_lines():
+        # Registered once the body runs, with the finally below releasing it: a client that
+        # disconnects before the body starts never adds the id, so it cannot stay behind
+        if batch_id in active_batches:
+            yield json.dumps({"status": "error", "error": f"Batch {batch_id} is already running"}) + "\n"
+            return
+        active_batches.add(batch_id)
+        try:
+            await ensure_agent_runtime()
+            if resume:
+                for result in read_checkpoint(output).values():
+                    yield batch_line({**result, "resumed": True})
+            async for result in run_batch(get_batch_runner(), records, output, resume=resume):
+                yield batch_line(result)
+        except Exception as e:
+            logging.error(f"Batch {batch_id} failed: {e}")
+            yield json.dumps({"status": "error", "error": str(e)}) + "\n"
+        finally:
+            active_batches.discard(batch_id)
+
+    return StreamingResponse(
+        result_lines(),
+        media_type="application/x-ndjson",
+        headers={"X-Batch-Id": batch_id, "Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/batch/{batch_id}")
+async def get_batch_results(batch_id: str):
+    """ Every result written so far for a batch: one line per item (failed items are dropped when the batch resumes). """
+    from utils.batch import batch_output_path
+    path = batch_output_path(batch_id)
+    if not batch_id.isalnum() or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Batch not found")
+    size = os.path.getsize(path)
+    if size == 0:
+        return Response(content=b"", media_type="application/x-ndjson")
+    return StreamingResponse(iter_file(path, 0, size - 1), media_type="application/x-ndjson", headers={"X-Batch-Running": str(batch_id in active_batches).lower()})
+
+
+def format_sse(event: str, data: Any) -> str:
+    """ Encode one Server-Sent Event frame. """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/agent/stream")
+async def agent_stream(request: PromptRequest):
+    async def event_source():
+        try:
+            await ensure_agent_runtime()
+            from utils import stream_agent_events_async
+            async with session_manager.acquire(request.user_id, request.session_id):
+                with result_cache_bypass(request.bypass_cache):
+                    async for item in stream_agent_events_async(
+                        query=request.prompt,
+                        runner=runner,
+                        user_id=request.user_id,
+                        session_id=request.session_id,
+                        logging=logging,
+                        state_delta=TURN_RESET_STATE
+                    ):
+                        if item["type"] == "final":
+                            session = await session_manager.get_or_create(request.user_id, request.session_id)
+                            yield format_sse("final", build_query_response(item["response"], session.state))
+                        else:
+                            yield format_sse(item["type"], item)
+        except HTTPException as e:
+            yield format_sse("error", {"status_code": e.status_code, "detail": e.detail})
+        except Exception as e:
+            logging.error(f"Agent stream failed: {e}")
+            status_code = 429 if is_rate_limit_error(e) else 500
+            yield format_sse("error", {"status_code": status_code, "detail": str(e)})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/artifacts/{artifact_id}")
+async def get_artifact(artifact_id: str, request: Request):
+    info = artifact_store.info(artifact_id)
+    if info is None or not os.path.exists(info["path"]):
+        raise HTTPException(status_code=404, detail="Artifact not found")
+
+    size = os.path.getsize(info["path"])
+    etag = f'"{info["etag"]}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        # Artifacts never change once written
+        "Cache-Control": "public, max-age=31536000, immutable",
+    }
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    byte_range = None
+    if range_header and request.headers.get("if-range", etag) == etag:
+        try:
+            # None for a malformed or multi-range header: ignored, the whole artifact is sent
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if byte_range:
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(iter_file(info["path"], start, end), status_code=206, media_type=info["content_type"], headers=headers)
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(iter_file(info["path"], 0, size - 1), media_type=info["content_type"], headers=headers)
+
+@app.get("/metrics")
+async def get_metrics():
+    # Prometheus text exposition format
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
@@ -1,4 +1,21 @@
-from .problem_state_manager import update_problem_config_tool
-from .exit_tool import exit_loop
-from .image_checker import image_checker
-from .generator_tool import image_creator
\ No newline at end of file
+import importlib
+
+# Tools and their heavy dependencies (PIL, numpy, google-genai) are imported on first access (PEP 562)
+_EXPORTS = {
+    "update_problem_config_tool": ".problem_state_manager",
+    "update_problem_config_bulk_tool": ".problem_state_manager",
+    "exit_loop": ".exit_tool",
+    "image_checker": ".image_checker",
+    "image_checker_batch": ".image_checker",
+    "image_creator": ".generator_tool",
+    "submit_final_result": ".final_result",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -1,5 +1,7 @@
-from google.adk.tools import FunctionTool, ToolContext
+from google.adk.tools import ToolContext
+from utils.metrics import timed
 
+@timed()
 def exit_loop(tool_context: ToolContext):
     """Signals that the iterative process should end."""
     print(f"  [Tool Call] exit_loop triggered by {tool_context.agent_name}")
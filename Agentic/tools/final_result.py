@@ -0,0 +1,18 @@
+from typing import Any, Dict, Optional
+from google.adk.tools import ToolContext
+from utils.metrics import timed
+
+@timed()
+def submit_final_result(
+    tool_context: ToolContext,
+    final_post: Optional[str] = None,
+    generated_image: bool = False
+) -> Dict[str, Any]:
+    """
+    Records the final result of this turn so the server can return it without parsing text.
+    - final_post: the finished post text, if text was generated
+    - generated_image: True if an image was generated in this turn
+    """
+    result = {"final_post": final_post, "generated_image": bool(generated_image)}
+    tool_context.state["final_result"] = result
+    return {"status": "success", "final_result": result}
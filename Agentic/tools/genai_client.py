@@ -0,0 +1,16 @@
+import threading
+from google import genai
+
+# One client per process: it owns the underlying HTTP connection pool,
+# so every tool call reuses open connections instead of building a new client.
+_client = None
+_client_lock = threading.Lock()
+
+def get_genai_client() -> genai.Client:
+    """ Returns the shared google-genai client, creating it on first use. """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = genai.Client()
+    return _client
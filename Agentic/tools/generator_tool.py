@@ -1,14 +1,30 @@
 import os
-from google import genai
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from google.genai import types
 from PIL import Image
 from io import BytesIO
-from dotenv import load_dotenv
+from .genai_client import get_genai_client
+from .image_cache import ImageCache, get_image_cache
+from utils.artifact_store import ArtifactStore, get_artifact_store
+from utils.metrics import metrics, timed
+from utils.result_cache import result_cache_bypassed
+from utils.rate_limiter import get_limiter
 
-load_dotenv()
+IMAGE_MODEL = "gemini-2.0-flash-preview-image-generation"
 
-def image_creator(text: str, style: str = "cheerful") -> str:
-    prompt = (
+# Threads used for decoding and writing images off the event loop
+IMAGE_IO_WORKERS = int(os.getenv("IMAGE_IO_WORKERS", 4))
+
+# Image generations share the process-wide "image" budget (GEMINI_IMAGE_RPM, MAX_CONCURRENT_IMAGES)
+_image_limiter = get_limiter("image")
+_io_executor = ThreadPoolExecutor(max_workers=IMAGE_IO_WORKERS, thread_name_prefix="image-io")
+
+metrics.register_cache("image", lambda: get_image_cache().stats() if get_image_cache() else None)
+
+def build_image_prompt(text: str, style: str = "cheerful") -> str:
+    return (
         f"You are a professional visual + content design assistant. "
         f"Your task is to generate high-quality {style.lower()} visuals for social media posts.\n\n"
 
@@ -35,24 +51,102 @@ def image_creator(text: str, style: str = "cheerful") -> str:
         f"(flyer, blog header, post, or banner) that is impactful and shareable."
     )
 
-    client = genai.Client()
+def save_image_bytes(data: bytes, mime_type: str, metadata: dict = None) -> str:
+    """ Blocking: store image bytes as a new PNG artifact, re-encoding only when the model did not return PNG. """
+    if mime_type != "image/png":
+        buffer = BytesIO()
+        Image.open(BytesIO(data)).save(buffer, format="PNG")
+        data = buffer.getvalue()
+    store = get_artifact_store()
+    return store.path(store.save_bytes(data, ".png", "image/png", metadata))
+
+def cache_artifact_id(key: str, etag: str) -> str:
+    """ Id of the artifact serving cache key with this content: hits share it, a new image under the key gets a new one. """
+    return hashlib.sha256(f"{key}:{etag}".encode("utf-8")).hexdigest()[:32]
+
+def _cached_artifact(cached_path: str, key: str) -> str:
+    """
+    Blocking: the artifact serving a cache entry. Every hit on key shares one artifact, so hits do not
+    copy the image again; it is re-created (without variants) if retention removed it.
+    """
+    with open(cached_path, "rb") as f:
+        data = f.read()
+    store = get_artifact_store()
+    artifact_id = cache_artifact_id(key, hashlib.sha256(data).hexdigest())
+    path = store.path(artifact_id)
+    if path and os.path.exists(path):
+        return path
+    return store.path(store.save_bytes(data, ".png", "image/png", {"cache_key": key}, artifact_id=artifact_id))
+
+def _alias_for_cache(image_path: str, key: str):
+    """ Blocking: serve future hits on key from an alias of the generated artifact, so they share its variants. """
+    store = get_artifact_store()
+    source_id = ArtifactStore.id_from_path(image_path)
+    info = store.info(source_id) if source_id else None
+    if info is not None:
+        store.alias(source_id, cache_artifact_id(key, info["etag"]), {"cache_key": key})
+
+async def load_cached_image(key: str):
+    """ The artifact for the cached image under key. Returns its path, or None on a miss. """
+    cache = get_image_cache()
+    if cache is None or result_cache_bypassed():
+        return None
+    loop = asyncio.get_running_loop()
+    cached_path = await loop.run_in_executor(_io_executor, cache.get_path, key)
+    if cached_path is None:
+        return None
+    return await loop.run_in_executor(_io_executor, _cached_artifact, cached_path, key)
 
-    response = client.models.generate_content(
-        model="gemini-2.0-flash-preview-image-generation",
+async def store_cached_image(key: str, image_path: str):
+    """ Add a generated image to the cache under key. """
+    cache = get_image_cache()
+    if cache is None or not os.path.exists(image_path):
+        return
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_io_executor, cache.put_file, key, image_path)
+    await loop.run_in_executor(_io_executor, _alias_for_cache, image_path, key)
+
+@timed()
+async def image_creator(text: str, style: str = "cheerful") -> str:
+    """
+    Generates a social media visual for the given text and style.
+    Returns the local filepath of the saved image, or an explanation if no image was produced.
+    """
+    return await generate_image(text, style)
+
+@timed()
+async def generate_image(text: str, style: str = "cheerful", variation: str = "", use_cache: bool = True) -> str:
+    """
+    Generate one image. 'variation' is appended to the prompt so several candidates
+    for the same text come out different; candidates bypass the cache lookup.
+    New images are not cached here: ImageGenerationAgent stores them once image_checker has passed them.
+    """
+    prompt = build_image_prompt(text, style)
+    if variation:
+        prompt = f"{prompt}\n\n{variation}"
+
+    # Same prompt, style and model: serve the stored image without a model round-trip
+    cache_key = ImageCache.make_key(text, style, IMAGE_MODEL)
+    if use_cache:
+        cached_path = await load_cached_image(cache_key)
+        if cached_path:
+            print(f"Image served from cache at {cached_path}")
+            return cached_path
+
+    client = get_genai_client()
+
+    response = await _image_limiter.call(lambda: client.aio.models.generate_content(
+        model=IMAGE_MODEL,
         contents=prompt,
         config=types.GenerateContentConfig(
             response_modalities=["TEXT", "IMAGE"]
         )
-    )
+    ))
     candidate = response.candidates[0]
     if candidate.content is None:
         print("No content found in candidate.")
         return {}
 
-    output_dir = "output"
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, "generated_image.png")
-
     text_found = None  # store text if received
 
     for idx, part in enumerate(candidate.content.parts):
@@ -62,8 +156,11 @@ def image_creator(text: str, style: str = "cheerful") -> str:
 
         if part.inline_data is not None:
             try:
-                image = Image.open(BytesIO(part.inline_data.data))
-                image.save(output_path)
+                loop = asyncio.get_running_loop()
+                output_path = await loop.run_in_executor(
+                    _io_executor, save_image_bytes, part.inline_data.data, part.inline_data.mime_type,
+                    {"model": IMAGE_MODEL, "style": style, "cache_key": cache_key}
+                )
                 print(f"Image successfully saved at {output_path}")
                 return output_path
             except Exception as e:
@@ -0,0 +1,120 @@
+import os
+import asyncio
+import logging
+import threading
+import multiprocessing
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from PIL import Image, ImageOps
+from utils.artifact_store import ArtifactStore, get_artifact_store
+from utils.metrics import timed
+from utils.single_flight import SingleFlight
+
+logger = logging.getLogger("orion_logs.image_variants")
+
+# Standard platform sizes, cropped around the center of the generated image
+VARIANT_SIZES: Dict[str, Tuple[int, int]] = {
+    "square": (1080, 1080),    # Instagram / LinkedIn feed
+    "portrait": (1080, 1350),  # Instagram portrait (4:5)
+    "banner": (1500, 500),     # Twitter/X header, web banners (3:1)
+}
+# Which of them to produce, and in which encodings ("" disables variants)
+IMAGE_VARIANTS = [name.strip() for name in os.getenv("IMAGE_VARIANTS", "square,portrait,banner").split(",") if name.strip() in VARIANT_SIZES]
+IMAGE_VARIANT_FORMATS = [fmt.strip() for fmt in os.getenv("IMAGE_VARIANT_FORMATS", "webp,jpeg").split(",") if fmt.strip() in ("webp", "jpeg")]
+WEBP_QUALITY = int(os.getenv("WEBP_QUALITY", 80))
+JPEG_QUALITY = int(os.getenv("JPEG_QUALITY", 85))
+# WebP effort 0 (fast) .. 6 (smallest); WebP encoding is most of the variant cost
+WEBP_METHOD = int(os.getenv("WEBP_METHOD", 4))
+# Processes resizing and encoding variants (CPU-bound, so off the event loop and the GIL)
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", min(4, os.cpu_count() or 1)))
+
+CONTENT_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+SUFFIXES = {"webp": ".webp", "jpeg": ".jpg"}
+
+_pool = None
+_pool_lock = threading.Lock()
+# One render per source artifact at a time: concurrent requests for the same image share it
+_renders = SingleFlight()
+
+def get_variant_pool() -> ProcessPoolExecutor:
+    """ The shared process pool, started on first use. Spawned, so workers do not inherit the server's threads. """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=IMAGE_VARIANT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def encode_variant(variant: Image.Image, fmt: str) -> bytes:
+    """ Encode an RGB image as WebP or JPEG at the tuned quality. """
+    buffer = BytesIO()
+    if fmt == "webp":
+        variant.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=WEBP_METHOD)
+    else:
+        variant.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+def render_variant(source_path: str, artifact_root: str, name: str, formats: List[str], metadata: dict) -> Dict[str, str]:
+    """
+    Runs in a pool process: center-crop the image to one platform size, store it in every format
+    as an artifact, and return {format: artifact_id}. The image is decoded and resized once per size.
+    """
+    size = VARIANT_SIZES[name]
+    with Image.open(source_path) as image:
+        variant = ImageOps.fit(image.convert("RGB"), size, method=Image.LANCZOS)
+    store = ArtifactStore(artifact_root)
+    return {
+        fmt: store.save_bytes(encode_variant(variant, fmt), SUFFIXES[fmt], CONTENT_TYPES[fmt], {
+            **metadata, "variant": name, "format": fmt, "width": size[0], "height": size[1],
+        })
+        for fmt in formats
+    }
+
+def _started(_) -> bool:
+    return True
+
+def warm_variant_pool():
+    """ Start the pool's worker processes ahead of the first image (blocking; used by utils.warm_up). """
+    if IMAGE_VARIANTS and IMAGE_VARIANT_FORMATS:
+        list(get_variant_pool().map(_started, range(IMAGE_VARIANT_WORKERS)))
+
+@timed()
+async def create_variants(image_path: str) -> Optional[Dict[str, Dict[str, str]]]:
+    """
+    Render every platform variant of a generated image in the process pool and register them in
+    the original artifact's metadata as {"variants": {name: {format: artifact_id}}}.
+    Returns that mapping, or None when variants are disabled or the image is not an artifact.
+    """
+    source_id = ArtifactStore.id_from_path(image_path)
+    if not IMAGE_VARIANTS or not IMAGE_VARIANT_FORMATS or not source_id:
+        return None
+    return await _renders.do(source_id, lambda: _render_variants(image_path, source_id))
+
+async def _render_variants(image_path: str, source_id: str) -> Optional[Dict[str, Dict[str, str]]]:
+    store = get_artifact_store()
+    loop = asyncio.get_running_loop()
+    info = await loop.run_in_executor(None, store.info, source_id)
+    if info is None:
+        return None
+    if info["metadata"].get("variants"):
+        # Same artifact served again (e.g. from the result cache, or an alias of a cached image)
+        return info["metadata"]["variants"]
+
+    pool = get_variant_pool()
+    # One job per size, so the sizes render on different cores
+    results = await asyncio.gather(
+        *(loop.run_in_executor(pool, render_variant, image_path, store.root, name, IMAGE_VARIANT_FORMATS, {"variant_of": source_id})
+          for name in IMAGE_VARIANTS),
+        return_exceptions=True
+    )
+
+    variants: Dict[str, Dict[str, str]] = {}
+    for name, result in zip(IMAGE_VARIANTS, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Variant {name} of {source_id} failed: {result}")
+            continue
+        variants[name] = result
+    await loop.run_in_executor(None, lambda: store.update_metadata(source_id, variants=variants))
+    logger.info(f"{sum(len(formats) for formats in variants.values())} variant(s) created for {source_id}")
+    return variants
@@ -1,9 +1,54 @@
-from typing import Any, Dict, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
+from pydantic import BaseModel, ConfigDict
 from google.adk.tools import ToolContext
+from utils.metrics import timed
+from utils.stage_graph import stale_stages
 
 # Define which fields are expected to be lists
 LIST_FIELDS = {"keywords", "hashtags", "external_reference_links"}
 
+class ProblemConfigUpdates(BaseModel):
+    """ The problem_config fields to set; leave out any field that should not change. """
+    model_config = ConfigDict(extra="allow")
+
+    post_type: Optional[str] = None
+    title: Optional[str] = None
+    summary: Optional[str] = None
+    keywords: Optional[List[str]] = None
+    tone: Optional[str] = None
+    length: Optional[str] = None
+    language: Optional[str] = None
+    style: Optional[str] = None
+    external_reference_links: Optional[List[str]] = None
+    hashtags: Optional[List[str]] = None
+    target_audience: Optional[str] = None
+    special_requirements: Optional[str] = None
+
+def coerce_problem_config_value(key: str, value: Any, problem_config: Dict[str, Any]) -> Tuple[Any, Union[str, None]]:
+    """
+    Validates and coerces a single problem_config value.
+    Returns (coerced_value, None) on success or (None, error_message) on failure.
+    """
+    if key not in problem_config:
+        return None, f"Key '{key}' is not a valid problem_config field."
+    if value is None:
+        # str(None) would store "None", which counts as filled in
+        return None, f"Missing value for '{key}'."
+
+    # Type validation and coercion
+    if key in LIST_FIELDS:
+        if isinstance(value, str):
+            # Convert comma-separated string to list
+            value = [v.strip() for v in value.split(",") if v.strip()]
+        elif not isinstance(value, list):
+            return None, f"Invalid type for '{key}': expected list or comma-separated string."
+    else:
+        # Coerce to string for non-list fields
+        value = str(value)
+
+    return value, None
+
+@timed()
 def update_problem_config_tool(
     key: str,
     value: Any,
@@ -21,37 +66,89 @@ def update_problem_config_tool(
         }
 
     problem_config = tool_context.state["problem_config"]
+    previous_value = problem_config.get(key)
 
-    if key not in problem_config:
+    value, error = coerce_problem_config_value(key, value, problem_config)
+    if error:
         return {
             "status": "error",
-            "message": f"Key '{key}' is not a valid problem_config field.",
+            "message": error,
             "updated_config": problem_config
         }
 
-    previous_value = problem_config.get(key)
-
-    # Type validation and coercion
-    if key in LIST_FIELDS:
-        if isinstance(value, str):
-            # Convert comma-separated string to list
-            value = [v.strip() for v in value.split(",") if v.strip()]
-        elif not isinstance(value, list):
-            return {
-                "status": "error",
-                "message": f"Invalid type for '{key}': expected list or comma-separated string.",
-                "updated_config": problem_config
-            }
-    else:
-        # Coerce to string for non-list fields
-        value = str(value)
-
     # Update the key (overwrite if exists)
     problem_config[key] = value
     tool_context.state["problem_config"] = problem_config
+    # Outputs derived from the old value must be regenerated; the others stay valid
+    tool_context.state["stale_stages"] = stale_stages(tool_context.state)
 
     return {
         "status": "success",
         "message": f"Updated '{key}' from '{previous_value}' to '{value}'",
-        "updated_config": problem_config
+        "updated_config": problem_config,
+        "stale_stages": tool_context.state["stale_stages"]
+    }
+
+@timed()
+def update_problem_config_bulk_tool(
+    updates: ProblemConfigUpdates,
+    tool_context: ToolContext
+) -> Dict[str, Any]:
+    """
+    Updates several problem_config keys in one call, e.g. {"title": "...", "tone": "formal", "hashtags": ["#a", "#b"]}.
+    Every value is validated first; the updates are applied together only if all of them are valid,
+    otherwise nothing changes and 'errors' lists the problem for each rejected key.
+    """
+    if "problem_config" not in tool_context.state:
+        return {
+            "status": "error",
+            "message": "Problem config has not been initialized in state.",
+            "errors": {},
+            "updated_config": None
+        }
+
+    problem_config = tool_context.state["problem_config"]
+
+    if isinstance(updates, BaseModel):
+        updates = updates.model_dump(exclude_unset=True)
+    if isinstance(updates, dict):
+        # An explicit null means the same as leaving the key out: it stays unchanged
+        updates = {key: value for key, value in updates.items() if value is not None}
+
+    if not isinstance(updates, dict) or not updates:
+        return {
+            "status": "error",
+            "message": "'updates' must be a non-empty object of problem_config keys to values.",
+            "errors": {},
+            "updated_config": problem_config
+        }
+
+    coerced = {}
+    errors = {}
+    for key, value in updates.items():
+        value, error = coerce_problem_config_value(key, value, problem_config)
+        if error:
+            errors[key] = error
+        else:
+            coerced[key] = value
+
+    if errors:
+        return {
+            "status": "error",
+            "message": f"No keys updated: {len(errors)} invalid value(s). Fix them and resend all updates.",
+            "errors": errors,
+            "updated_config": problem_config
+        }
+
+    # Apply all updates with a single state write
+    updated_config = {**problem_config, **coerced}
+    tool_context.state["problem_config"] = updated_config
+    tool_context.state["stale_stages"] = stale_stages(tool_context.state)
+
+    return {
+        "status": "success",
+        "message": f"Updated {len(coerced)} key(s): {', '.join(coerced)}",
+        "errors": {},
+        "updated_config": updated_config,
+        "stale_stages": tool_context.state["stale_stages"]
     }
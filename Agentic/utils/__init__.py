@@ -1,2 +1,23 @@
-from .input_formatter import format_query
-from .agent_utils import call_agent_query_async, create_session, create_runner, retrieve_session
\ No newline at end of file
+import importlib
+
+# The agent helpers import google.adk; load them on first access (PEP 562) so the
+# lightweight utilities (metrics, artifact store, JSON extraction) import instantly
+_EXPORTS = {
+    "format_query": ".input_formatter",
+    "call_agent_query_async": ".agent_utils",
+    "stream_agent_events_async": ".agent_utils",
+    "create_session": ".agent_utils",
+    "create_runner": ".agent_utils",
+    "retrieve_session": ".agent_utils",
+    "SessionManager": ".session_manager",
+    "default_session_state": ".session_manager",
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
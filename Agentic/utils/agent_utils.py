@@ -1,8 +1,25 @@
 from .input_formatter import format_query
 from google.adk.runners import Runner
+from google.adk.agents.run_config import RunConfig, StreamingMode
+from typing import Any, AsyncGenerator, Dict, Optional
 import logging
+from logger_config import summarize_content
+from .metrics import RunTracer
 
-async def call_agent_query_async(query: str, runner: Runner, user_id: str, session_id: str, logging: logging.Logger) -> None:
+def final_text(event, current: str) -> str:
+    """
+    The turn's response text after event. Sequential and loop agents produce a final response per
+    sub-agent, so the last one wins and the run is consumed to the end: breaking out at the first
+    one would cancel the sub-agents still to come (and the result stores that follow them).
+    """
+    if event.is_final_response():
+        if event.content and event.content.parts and event.content.parts[0].text:
+            return event.content.parts[0].text
+        if event.actions and event.actions.escalate:
+            return f"Agent escalated: {event.error_message or 'No specific message.'}"
+    return current
+
+async def call_agent_query_async(query: str, runner: Runner, user_id: str, session_id: str, logging: logging.Logger, state_delta: Optional[Dict[str, Any]] = None) -> None:
     """
     Call the agent asynchronously with the provided query.
 
@@ -11,6 +28,7 @@ async def call_agent_query_async(query: str, runner: Runner, user_id: str, sessi
         runner (Runner): The runner instance that manages the agent.
         user_id (str): The ID of the user making the request.
         session_id (str): The ID of the session for this interaction.
+        state_delta (dict, optional): State changes applied to the session before the agent runs.
 
     Returns:
         str: The response from the agent.
@@ -22,19 +40,65 @@ async def call_agent_query_async(query: str, runner: Runner, user_id: str, sessi
 
     final_response_text = "Agent did not produce a final response."
     
-    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content):
-        logging.info(f"  [Event] Author: {event.author}, Type: {type(event).__name__}, Final: {event.is_final_response()}, Content: {event.content}")
+    run_kwargs = {"state_delta": state_delta} if state_delta else {}
+    tracer = RunTracer()
 
-        if event.is_final_response():
-            if event.content and event.content.parts:
-                final_response_text = event.content.parts[0].text
-            elif event.actions and event.actions.escalate: 
-                final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
-            break
+    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content, **run_kwargs):
+        tracer.observe(event)
+        # Summarized at DEBUG: full contents can be whole posts or inline image bytes
+        logging.debug(f"  [Event] Author: {event.author}, Type: {type(event).__name__}, Final: {event.is_final_response()}, Content: {summarize_content(event.content)}")
 
+        final_response_text = final_text(event, final_response_text)
+
+    tracer.finish()
     logging.info(f"\n<<< Agent Response: {final_response_text}")
     return final_response_text
 
+async def stream_agent_events_async(query: str, runner: Runner, user_id: str, session_id: str, logging: logging.Logger, state_delta: Optional[Dict[str, Any]] = None) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Run the agent with token streaming enabled and yield each step as it happens.
+
+    Yields dicts with a 'type' of:
+        - 'agent': a new agent started producing events
+        - 'text': text from an agent ('partial' is True for streamed chunks)
+        - 'tool_call' / 'tool_result': function calls and their responses
+        - 'final': the final response text, always the last item
+    """
+
+    logging.info(f"\n>>> User Query (stream): {query}")
+
+    content = format_query(query)
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE)
+
+    final_response_text = "Agent did not produce a final response."
+    current_author = None
+
+    run_kwargs = {"state_delta": state_delta} if state_delta else {}
+    tracer = RunTracer()
+
+    async for event in runner.run_async(user_id=user_id, session_id=session_id, new_message=content, run_config=run_config, **run_kwargs):
+        tracer.observe(event)
+        if event.author != current_author:
+            current_author = event.author
+            yield {"type": "agent", "agent": current_author}
+
+        for call in event.get_function_calls():
+            yield {"type": "tool_call", "agent": event.author, "name": call.name, "args": call.args}
+
+        for result in event.get_function_responses():
+            yield {"type": "tool_result", "agent": event.author, "name": result.name, "response": result.response}
+
+        if event.content and event.content.parts:
+            text = "".join(part.text for part in event.content.parts if part.text)
+            if text:
+                yield {"type": "text", "agent": event.author, "text": text, "partial": bool(event.partial)}
+
+        final_response_text = final_text(event, final_response_text)
+
+    tracer.finish()
+    logging.info(f"\n<<< Agent Response (stream): {final_response_text}")
+    yield {"type": "final", "response": final_response_text}
+
 async def create_session(session_service, app_name: str, user_id: str, session_id: str, state: dict, logging: logging.Logger):
     """ Create a new session for the agent. """
     session = await session_service.create_session(
@@ -0,0 +1,230 @@
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import tempfile
+import threading
+from typing import Any, Dict, Iterator, Optional, Tuple
+from .metrics import metrics
+
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", os.path.join("output", "artifacts"))
+# Retention (see ArtifactStore.sweep): artifacts older than this many seconds are removed, then the
+# oldest ones until the store fits in the byte budget (0 disables either limit)
+ARTIFACT_MAX_AGE = float(os.getenv("ARTIFACT_MAX_AGE", 7 * 24 * 60 * 60))
+ARTIFACT_MAX_BYTES = int(os.getenv("ARTIFACT_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+ARTIFACT_SWEEP_INTERVAL = float(os.getenv("ARTIFACT_SWEEP_INTERVAL", 10 * 60))
+
+ARTIFACTS_REMOVED = metrics.counter("orion_artifacts_removed_total", "Artifacts removed by retention", ("reason",))
+
+# Artifact ids are uuid4 hex strings; anything else never touches the filesystem
+_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+_PATH_PATTERN = re.compile(r"([0-9a-f]{32})\.\w+$")
+
+class ArtifactStore:
+    """
+    Stores every generated file under its own unique id.
+
+    Each artifact is a data file '<id><suffix>' plus a '<id>.json' sidecar with
+    its content type, size, sha256 ETag and free-form metadata. Both files are
+    written to a temp file and moved into place, so readers never see a partial write.
+    """
+
+    def __init__(self, root: str = ARTIFACT_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _meta_path(self, artifact_id: str) -> str:
+        return os.path.join(self.root, f"{artifact_id}.json")
+
+    def _write_atomic(self, path: str, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _write_meta(self, artifact_id: str, meta: Dict[str, Any]):
+        self._write_atomic(self._meta_path(artifact_id), json.dumps(meta).encode("utf-8"))
+
+    def save_bytes(self, data: bytes, suffix: str = ".png", content_type: str = "image/png", metadata: Optional[Dict[str, Any]] = None, artifact_id: Optional[str] = None) -> str:
+        """ Store data as a new artifact and return its id (a fresh one unless artifact_id is given). """
+        artifact_id = artifact_id or uuid.uuid4().hex
+        filename = f"{artifact_id}{suffix}"
+        self._write_atomic(os.path.join(self.root, filename), data)
+        self._write_meta(artifact_id, {
+            "id": artifact_id,
+            "filename": filename,
+            "content_type": content_type,
+            "size": len(data),
+            "etag": hashlib.sha256(data).hexdigest(),
+            "created_at": time.time(),
+            "metadata": metadata or {},
+        })
+        return artifact_id
+
+    def save_file(self, source_path: str, content_type: str = "image/png", metadata: Optional[Dict[str, Any]] = None, artifact_id: Optional[str] = None) -> str:
+        """ Copy an existing file into the store as an artifact and return its id. """
+        with open(source_path, "rb") as f:
+            data = f.read()
+        return self.save_bytes(data, os.path.splitext(source_path)[1] or ".bin", content_type, metadata, artifact_id)
+
+    def alias(self, source_id: str, artifact_id: str, metadata: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        Store an existing artifact under another id without copying its bytes (a hard link, or a copy where
+        the filesystem has none). The alias keeps the source's metadata, e.g. its variants, plus metadata.
+        Returns the alias id, or None when the source does not exist.
+        """
+        meta = self.info(source_id)
+        if meta is None:
+            return None
+        filename = f"{artifact_id}{os.path.splitext(meta['filename'])[1]}"
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        os.close(fd)
+        os.remove(tmp_path)
+        try:
+            os.link(meta.pop("path"), tmp_path)
+            os.replace(tmp_path, os.path.join(self.root, filename))
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            with open(os.path.join(self.root, meta["filename"]), "rb") as f:
+                self._write_atomic(os.path.join(self.root, filename), f.read())
+        self._write_meta(artifact_id, {
+            **meta,
+            "id": artifact_id,
+            "filename": filename,
+            "created_at": time.time(),
+            "metadata": {**meta["metadata"], **(metadata or {}), "alias_of": source_id},
+        })
+        return artifact_id
+
+    def info(self, artifact_id: str) -> Optional[Dict[str, Any]]:
+        """ Returns the artifact's metadata including its local 'path', or None if it does not exist. """
+        if not _ID_PATTERN.match(artifact_id or ""):
+            return None
+        try:
+            with open(self._meta_path(artifact_id), "r") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        meta["path"] = os.path.join(self.root, meta["filename"])
+        return meta
+
+    def path(self, artifact_id: str) -> Optional[str]:
+        meta = self.info(artifact_id)
+        return meta["path"] if meta else None
+
+    def update_metadata(self, artifact_id: str, **metadata):
+        """ Merge keys into an artifact's metadata. """
+        meta = self.info(artifact_id)
+        if meta is None:
+            raise KeyError(artifact_id)
+        meta.pop("path")
+        meta["metadata"].update(metadata)
+        self._write_meta(artifact_id, meta)
+
+    def remove(self, artifact_id: str):
+        """ Delete an artifact's data file and sidecar (the sidecar last, so it is never left pointing at nothing). """
+        meta = self.info(artifact_id)
+        if meta is None:
+            return
+        for path in (meta["path"], self._meta_path(artifact_id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def sweep(self, max_age: float = ARTIFACT_MAX_AGE, max_bytes: int = ARTIFACT_MAX_BYTES) -> int:
+        """
+        Blocking: remove artifacts older than max_age, then the oldest ones until the store is within
+        max_bytes. Reads the sidecars from disk, so artifacts written by other processes (e.g. the
+        variant pool) count too. Returns the number removed.
+        """
+        artifacts = []
+        for entry in os.scandir(self.root):
+            if entry.name.endswith(".json"):
+                meta = self.info(entry.name[:-5])
+                if meta is not None:
+                    artifacts.append((meta.get("created_at", 0), meta["id"], meta.get("size", 0)))
+        artifacts.sort()
+
+        now = time.time()
+        total = sum(size for _, _, size in artifacts)
+        removed = 0
+        for created_at, artifact_id, size in artifacts:
+            if max_age and now - created_at > max_age:
+                reason = "age"
+            elif max_bytes and total > max_bytes:
+                reason = "size"
+            else:
+                break
+            self.remove(artifact_id)
+            ARTIFACTS_REMOVED.inc(reason=reason)
+            total -= size
+            removed += 1
+        return removed
+
+    @staticmethod
+    def id_from_path(path: str) -> Optional[str]:
+        """ Recover the artifact id from a path returned by the store (e.g. the 'final_image' state value). """
+        match = _PATH_PATTERN.search(path or "")
+        return match.group(1) if match else None
+
+_artifact_store = None
+_artifact_store_lock = threading.Lock()
+
+def get_artifact_store() -> ArtifactStore:
+    """ Returns the shared artifact store. """
+    global _artifact_store
+    if _artifact_store is None:
+        with _artifact_store_lock:
+            if _artifact_store is None:
+                _artifact_store = ArtifactStore()
+    return _artifact_store
+
+class RangeNotSatisfiable(ValueError):
+    """ A well-formed Range that selects no byte of the artifact (answered with 416). """
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single 'bytes=' Range header into an inclusive (start, end).
+    Returns None when the header is malformed or asks for several ranges: the server ignores it
+    and sends the whole artifact. Raises RangeNotSatisfiable when the range is past the end.
+    """
+    match = re.fullmatch(r"\s*bytes=(\d*)-(\d*)\s*", range_header or "")
+    if not match:
+        return None
+    start, end = match.groups()
+    if start == "" and end == "":
+        return None
+    if start == "":
+        # Suffix range: the last N bytes
+        length = int(end)
+        if length == 0 or size == 0:
+            raise RangeNotSatisfiable(range_header)
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = int(end) if end else None
+    if end is not None and end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable(range_header)
+    return start, size - 1 if end is None else min(end, size - 1)
+
+def iter_file(path: str, start: int, end: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """ Yield bytes start..end (inclusive) of a file in chunks. """
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
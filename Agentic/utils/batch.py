@@ -0,0 +1,239 @@
+import os
+import csv
+import json
+import time
+import uuid
+import asyncio
+import logging
+from io import StringIO
+from typing import Any, AsyncGenerator, Dict, List, Optional, Set
+from .artifact_store import ArtifactStore, get_artifact_store
+from .metrics import metrics
+from .result_cache import canonical_hash, is_finalized
+from .session_manager import default_session_state
+
+# Items of one batch generated at the same time (the Gemini budgets in utils.rate_limiter still apply)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 4))
+# Where POST /batch keeps each batch's results; they double as its checkpoint
+BATCH_DIR = os.getenv("BATCH_DIR", os.path.join("output", "batches"))
+
+BATCH_ITEMS = metrics.counter("orion_batch_items_total", "Batch items by outcome: succeeded, failed, skipped (already done)", ("status",))
+BATCH_ITEM_DURATION = metrics.histogram("orion_batch_item_duration_seconds", "Time to generate one batch item", ("generate",))
+
+# Post types that get a visual next to the text when a record does not say what to generate
+VISUAL_POST_TYPES = ("flyer", "poster", "infographic", "banner")
+GENERATE_MODES = ("text", "image", "both")
+# Record keys that are not problem_config fields
+RECORD_KEYS = ("id", "generate", "web_info_output")
+
+BATCH_QUERY = "Generate the content for the campaign described in problem_config."
+
+def parse_records(data: str, fmt: str) -> List[Dict[str, Any]]:
+    """
+    Records of a batch file. JSONL: one object per line, either the problem_config fields themselves
+    or {"problem_config": {...}} plus the record keys. CSV: a header row of field names; list fields
+    are comma-separated inside their cell and empty cells are left unset.
+    """
+    if fmt == "csv":
+        return [{key.strip(): value for key, value in row.items() if key and value not in (None, "")} for row in csv.DictReader(StringIO(data))]
+    records = []
+    for number, line in enumerate(data.splitlines(), 1):
+        if line.strip():
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                records.append({"error": f"line {number}: invalid JSON ({e.msg})"})
+    return records
+
+def read_records(path: str) -> List[Dict[str, Any]]:
+    """ parse_records() for a file, the format taken from its extension (.csv, anything else is JSONL). """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return parse_records(f.read(), "csv" if path.lower().endswith(".csv") else "jsonl")
+
+def build_item(record: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """
+    Validate one record into {"id", "generate", "state", "error"}. The id is the record's own or a
+    hash of its content, so the same record keeps its id when the batch is resumed.
+    """
+    item = {"id": f"line-{index + 1}", "index": index, "generate": None, "state": None, "error": None}
+    if not isinstance(record, dict) or "error" in record:
+        item["error"] = record.get("error") if isinstance(record, dict) else "Record is not an object"
+        return item
+    item["id"] = str(record.get("id") or canonical_hash(record)[:16])
+    fields = dict(record.get("problem_config") or {})
+    fields.update({key: value for key, value in record.items() if key not in RECORD_KEYS + ("problem_config",)})
+    # A null field keeps its default, like an empty CSV cell
+    fields = {key: value for key, value in fields.items() if value is not None}
+
+    # Same validation as the agents' update_problem_config tools
+    from tools.problem_state_manager import coerce_problem_config_value
+    state = default_session_state()
+    config = state["problem_config"]
+    for key, value in fields.items():
+        value, error = coerce_problem_config_value(key, value, config)
+        if error:
+            item["error"] = error
+            return item
+        config[key] = value
+    if not is_finalized(config):
+        item["error"] = "problem_config is not fully specified (needs title, summary, keywords, post_type and target_audience)"
+        return item
+    if record.get("web_info_output"):
+        state["web_info_output"] = record["web_info_output"]
+
+    generate = record.get("generate") or ("both" if str(config["post_type"]).lower() in VISUAL_POST_TYPES else "text")
+    if generate not in GENERATE_MODES:
+        item["error"] = f"Invalid 'generate': {generate!r}, expected one of {', '.join(GENERATE_MODES)}"
+        return item
+    item.update(generate=generate, state=state)
+    return item
+
+def read_checkpoint(path: str) -> Dict[str, Dict[str, Any]]:
+    """ Results already written to a batch's output, by item id. Failed items are not in it: they run again. """
+    done = {}
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # Torn last line of an interrupted batch
+                continue
+            if result.get("status") == "success":
+                done[result["id"]] = result
+    return done
+
+def compact_checkpoint(path: str, done: Dict[str, Dict[str, Any]]):
+    """ Rewrite a batch's output with only its successful results, dropping failed attempts that run again. """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for result in done.values():
+            f.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def append_result(path: str, result: Dict[str, Any]):
+    """ Append one result line and flush it, so it survives the batch being interrupted right after. """
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def item_result(item: Dict[str, Any], state: Dict[str, Any], artifact_store: ArtifactStore) -> Dict[str, Any]:
+    """ The result line for an item from its session state after the run. """
+    result = {"id": item["id"], "index": item["index"], "status": "success", "generate": item["generate"]}
+    if item["generate"] in ("text", "both"):
+        result["final_post"] = state.get("final_post")
+        if not result["final_post"]:
+            return {**result, "status": "error", "error": "Post was not generated"}
+    if item["generate"] in ("image", "both"):
+        artifact_id = ArtifactStore.id_from_path(state.get("final_image"))
+        info = artifact_store.info(artifact_id) if artifact_id else None
+        if info is None:
+            return {**result, "status": "error", "error": "Image was not generated"}
+        result.update(image_id=artifact_id, image_url=f"/artifacts/{artifact_id}", image_path=info["path"])
+        variants = info["metadata"].get("variants")
+        if variants:
+            result["variants"] = {
+                name: {fmt: f"/artifacts/{variant_id}" for fmt, variant_id in formats.items()}
+                for name, formats in variants.items()
+            }
+    return result
+
+class BatchRunner:
+    """
+    Generates batch items straight through the generation stages (agents.batch_agents): the records
+    carry a complete problem_config, so there is no requirement gathering. Every item runs in its own
+    throwaway session; up to `concurrency` items run at once and results are yielded as they finish.
+    """
+
+    def __init__(self, logging: logging.Logger, app_name: str = "orion_batch", concurrency: int = BATCH_CONCURRENCY):
+        from google.adk.runners import Runner
+        from google.adk.sessions import InMemorySessionService
+        from agents.batch_agents import BATCH_AGENTS
+
+        self.logging = logging
+        self.app_name = app_name
+        self.concurrency = max(1, concurrency)
+        self.session_service = InMemorySessionService()
+        self.runners = {
+            generate: Runner(agent=agent, app_name=app_name, session_service=self.session_service)
+            for generate, agent in BATCH_AGENTS.items()
+        }
+        self.artifact_store = get_artifact_store()
+
+    async def run_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """ Generate one validated item; failures become an error result instead of stopping the batch. """
+        from .agent_utils import call_agent_query_async
+        if item["error"]:
+            return {"id": item["id"], "index": item["index"], "status": "error", "error": item["error"]}
+
+        user_id, session_id = "batch", f"{item['id']}-{uuid.uuid4().hex[:8]}"
+        start = time.perf_counter()
+        try:
+            await self.session_service.create_session(app_name=self.app_name, user_id=user_id, session_id=session_id, state=item["state"])
+            await call_agent_query_async(
+                query=BATCH_QUERY,
+                runner=self.runners[item["generate"]],
+                user_id=user_id,
+                session_id=session_id,
+                logging=self.logging
+            )
+            session = await self.session_service.get_session(app_name=self.app_name, user_id=user_id, session_id=session_id)
+            result = item_result(item, session.state, self.artifact_store)
+        except Exception as e:
+            self.logging.error(f"Batch item {item['id']} failed: {e}")
+            result = {"id": item["id"], "index": item["index"], "status": "error", "error": str(e)}
+        finally:
+            await self.session_service.delete_session(app_name=self.app_name, user_id=user_id, session_id=session_id)
+        BATCH_ITEM_DURATION.observe(time.perf_counter() - start, generate=item["generate"])
+        result["duration_s"] = round(time.perf_counter() - start, 3)
+        return result
+
+    async def run(self, items: List[Dict[str, Any]], skip_ids: Optional[Set[str]] = None) -> AsyncGenerator[Dict[str, Any], None]:
+        """ Run every item not in skip_ids, yielding results in completion order. """
+        skip_ids = skip_ids or set()
+        pending = [item for item in items if item["id"] not in skip_ids]
+        if len(items) > len(pending):
+            BATCH_ITEMS.inc(len(items) - len(pending), status="skipped")
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def run_bounded(item):
+            async with slots:
+                return await self.run_item(item)
+
+        tasks = [asyncio.create_task(run_bounded(item)) for item in pending]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                BATCH_ITEMS.inc(status="succeeded" if result["status"] == "success" else "failed")
+                yield result
+        finally:
+            # Consumer went away (client disconnected, Ctrl-C): stop the items still running
+            for task in tasks:
+                task.cancel()
+
+async def run_batch(runner: BatchRunner, records: List[Dict[str, Any]], output_path: str, resume: bool = True) -> AsyncGenerator[Dict[str, Any], None]:
+    """
+    Run a batch file's records, appending each result to output_path as it finishes. With resume,
+    items that already succeeded in output_path are not run again and the output is compacted to
+    those results first, so it holds one line per item; without resume the output starts over.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    if not resume and os.path.exists(output_path):
+        os.remove(output_path)
+    done = read_checkpoint(output_path)
+    if os.path.exists(output_path):
+        compact_checkpoint(output_path, done)
+    items = [build_item(record, index) for index, record in enumerate(records)]
+    runner.logging.info(f"Batch: {len(items)} item(s), {sum(1 for item in items if item['id'] in done)} already done, output '{output_path}'")
+
+    loop = asyncio.get_running_loop()
+    async for result in runner.run(items, skip_ids=set(done)):
+        await loop.run_in_executor(None, append_result, output_path, result)
+        yield result
+
+def batch_output_path(batch_id: str) -> str:
+    return os.path.join(BATCH_DIR, f"{batch_id}.jsonl")
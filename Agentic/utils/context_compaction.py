@@ -0,0 +1,95 @@
+import os
+import re
+import json
+from typing import Any, Callable, List, Mapping, Optional
+from google.genai import types
+from google.adk.agents.readonly_context import ReadonlyContext
+from .metrics import metrics
+
+# Messages of session history sent to the model verbatim; older ones are condensed into one summary (0 = keep all)
+CONTEXT_HISTORY_MESSAGES = int(os.getenv("CONTEXT_HISTORY_MESSAGES", 24))
+# Characters kept from each earlier user message in that summary
+CONTEXT_SUMMARY_CHARS = int(os.getenv("CONTEXT_SUMMARY_CHARS", 160))
+CONTEXT_SUMMARY_MAX_MESSAGES = int(os.getenv("CONTEXT_SUMMARY_MAX_MESSAGES", 10))
+
+PROMPT_TOKENS = metrics.histogram(
+    "orion_llm_prompt_tokens", "Prompt tokens per model call", ("agent",),
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000, 128000)
+)
+TRIMMED_MESSAGES = metrics.counter("orion_context_trimmed_messages_total", "History messages condensed out of model requests", ("agent",))
+
+_PLACEHOLDER = re.compile(r"{+[^{}]*}+")
+
+def _drop_empty(value: Any) -> Any:
+    if isinstance(value, dict):
+        value = {k: _drop_empty(v) for k, v in value.items()}
+        return {k: v for k, v in value.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [item for item in (_drop_empty(v) for v in value) if item not in (None, "", [], {})]
+    return value
+
+def compact_value(value: Any) -> str:
+    """ Prompt form of a state value: dicts and lists as minified JSON of their populated fields only. """
+    if isinstance(value, (dict, list)):
+        return json.dumps(_drop_empty(value), separators=(",", ":"), ensure_ascii=False, default=str)
+    return str(value)
+
+def render_instruction(template: str, state: Mapping[str, Any]) -> str:
+    """ Fill {key} / {key?} placeholders like ADK does, with compact_value() instead of str(). """
+    def replace(match):
+        name = match.group().lstrip("{").rstrip("}").strip()
+        optional = name.endswith("?")
+        name = name.removesuffix("?")
+        if not name.split(":")[-1].isidentifier():
+            return match.group()
+        if name not in state:
+            if optional:
+                return ""
+            raise KeyError(f"Context variable not found: `{name}`.")
+        return compact_value(state[name])
+    return _PLACEHOLDER.sub(replace, template)
+
+def compact_instruction(template: str) -> Callable[[ReadonlyContext], str]:
+    """ Instruction provider for an LlmAgent: the template rendered with compact state values. """
+    def provider(context: ReadonlyContext) -> str:
+        return render_instruction(template, context.state)
+    return provider
+
+def _is_turn_start(content: types.Content) -> bool:
+    """ A user message with text: history can be cut here without splitting a tool call from its response. """
+    parts = content.parts or []
+    return content.role == "user" and any(part.text for part in parts) and not any(part.function_response for part in parts)
+
+def summarize_history(contents: List[types.Content]) -> types.Content:
+    """ One message standing in for the condensed history: the last few user messages, shortened. """
+    lines = []
+    for content in contents:
+        if _is_turn_start(content):
+            text = " ".join(" ".join(part.text for part in content.parts if part.text).split())
+            lines.append("- " + (text[:CONTEXT_SUMMARY_CHARS] + "..." if len(text) > CONTEXT_SUMMARY_CHARS else text))
+    lines = lines[-CONTEXT_SUMMARY_MAX_MESSAGES:]
+    header = (
+        f"[{len(contents)} earlier messages condensed. The current requirements and results are in the "
+        f"instructions; earlier user messages, shortened:]"
+    )
+    return types.Content(role="user", parts=[types.Part(text="\n".join([header] + lines))])
+
+def trim_history(callback_context, llm_request) -> Optional[Any]:
+    """ before_model_callback: keep the last CONTEXT_HISTORY_MESSAGES messages, condense the rest. """
+    contents = llm_request.contents or []
+    if not CONTEXT_HISTORY_MESSAGES or len(contents) <= CONTEXT_HISTORY_MESSAGES:
+        return None
+    # First turn boundary inside the window
+    cut = next((i for i in range(len(contents) - CONTEXT_HISTORY_MESSAGES, len(contents)) if _is_turn_start(contents[i])), None)
+    if not cut:
+        return None
+    llm_request.contents = [summarize_history(contents[:cut])] + contents[cut:]
+    TRIMMED_MESSAGES.inc(cut, agent=callback_context.agent_name)
+    return None
+
+def record_prompt_tokens(callback_context, llm_response) -> Optional[Any]:
+    """ after_model_callback: prompt size per agent, to check it stays flat as conversations grow. """
+    usage = llm_response.usage_metadata
+    if usage and usage.prompt_token_count and not llm_response.partial:
+        PROMPT_TOKENS.observe(usage.prompt_token_count, agent=callback_context.agent_name)
+    return None
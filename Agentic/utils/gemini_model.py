@@ -0,0 +1,48 @@
+from typing import AsyncGenerator
+from google.adk.models.google_llm import Gemini
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from .rate_limiter import get_limiter
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+def request_budget(llm_request: LlmRequest) -> str:
+    """ 'search' for requests grounded with google_search, 'text' otherwise. """
+    tools = (llm_request.config.tools if llm_request.config else None) or []
+    if any(getattr(tool, "google_search", None) or getattr(tool, "google_search_retrieval", None) for tool in tools):
+        return "search"
+    return "text"
+
+class RateLimitedGemini(Gemini):
+    """
+    Gemini whose requests go through the process-wide rate limiter.
+
+    A request holds its slot until the first response arrives (the whole response
+    when not streaming), so the slot is never held while the agent runs the tools
+    the model asked for. Rate-limit errors before that point are retried with backoff.
+    """
+
+    async def generate_content_async(self, llm_request: LlmRequest, stream: bool = False) -> AsyncGenerator[LlmResponse, None]:
+        limiter = get_limiter(request_budget(llm_request))
+        attempt = 0
+        while True:
+            responses = super().generate_content_async(llm_request, stream)
+            try:
+                async with limiter.slot():
+                    first = await anext(responses)
+            except StopAsyncIteration:
+                return
+            except Exception as e:
+                await responses.aclose()
+                await limiter.retry_or_raise(e, attempt)
+                attempt += 1
+                continue
+            break
+
+        yield first
+        async for response in responses:
+            yield response
+
+def gemini_model(model: str = DEFAULT_MODEL) -> RateLimitedGemini:
+    """ Model for an LlmAgent: model=gemini_model() instead of model="gemini-2.5-flash". """
+    return RateLimitedGemini(model=model)
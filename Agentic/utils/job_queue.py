@@ -0,0 +1,181 @@
+import math
+import time
+import uuid
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from .metrics import metrics
+
+JOBS = metrics.counter("orion_jobs_total", "Background jobs by outcome: submitted, rejected, succeeded, failed", ("status",))
+JOB_WAIT = metrics.histogram("orion_job_wait_seconds", "Time jobs spent queued before a worker picked them up")
+JOB_DURATION = metrics.histogram("orion_job_duration_seconds", "Time workers spent running jobs", ("status",))
+
+# Used for Retry-After until the first job has finished
+DEFAULT_JOB_SECONDS = 30.0
+
+
+class QueueFullError(Exception):
+    """ Raised by JobQueue.submit when the queue is at capacity. """
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class Job:
+    payload: Any
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"  # queued -> running -> succeeded | failed
+    seq: int = 0
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: Any = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == "succeeded":
+            data["result"] = self.result
+        elif self.status == "failed":
+            data["error"] = self.error
+        return data
+
+
+class JobQueue:
+    """
+    Bounded FIFO of jobs run by a fixed pool of asyncio workers.
+
+    submit() never waits: when max_size jobs are already queued it raises
+    QueueFullError with an estimate of when a slot frees up, so callers can
+    answer 429 instead of piling up work. Finished jobs are kept for
+    result_ttl seconds so clients can poll for them.
+    """
+
+    def __init__(self, handler: Callable[[Any], Awaitable[Any]], logging: logging.Logger, workers: int = 4, max_size: int = 100, result_ttl: float = 3600):
+        self.handler = handler
+        self.logging = logging
+        self.workers = workers
+        self.max_size = max_size
+        self.result_ttl = result_ttl
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: Dict[str, Job] = {}
+        self._submitted = 0
+        self._dequeued = 0
+        self._running = 0
+        self._avg_seconds: Optional[float] = None
+        metrics.gauge("orion_job_queue_depth", "Jobs waiting for a worker", lambda: self.queued)
+        metrics.gauge("orion_job_queue_running", "Jobs being run by a worker", lambda: self._running)
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def start(self):
+        """ Start the workers. Must be called from the running event loop. """
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        self.logging.info(f"Job queue started with {self.workers} workers (max {self.max_size} queued)")
+
+    async def stop(self):
+        """ Cancel the workers; jobs still queued or running are marked failed. """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for job in self._jobs.values():
+            if not job.finished:
+                job.status = "failed"
+                job.error = "Server shut down before the job finished"
+                job.finished_at = time.time()
+
+    def retry_after(self) -> int:
+        """ Seconds until a queue slot is likely to free up, from the average job duration. """
+        average = self._avg_seconds or DEFAULT_JOB_SECONDS
+        return max(1, math.ceil(average * (self.queued + 1) / max(1, self.workers)))
+
+    def submit(self, payload: Any) -> Job:
+        """ Queue payload for the handler and return its job, or raise QueueFullError. """
+        self._prune()
+        if self._queue is None:
+            self.start()
+        job = Job(payload=payload, seq=self._submitted)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            JOBS.inc(status="rejected")
+            raise QueueFullError(self.retry_after())
+        self._submitted += 1
+        self._jobs[job.id] = job
+        JOBS.inc(status="submitted")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._prune()
+        return self._jobs.get(job_id)
+
+    def position(self, job: Job) -> Optional[int]:
+        """ 1-based place of a queued job in line, None once a worker has it. """
+        if job.status != "queued":
+            return None
+        return job.seq - self._dequeued + 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queued": self.queued,
+            "running": self._running,
+            "max_size": self.max_size,
+            "avg_job_seconds": self._avg_seconds,
+        }
+
+    def _prune(self):
+        """ Forget finished jobs older than result_ttl. """
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def _worker(self, number: int):
+        while True:
+            job = await self._queue.get()
+            self._dequeued += 1
+            self._running += 1
+            job.status = "running"
+            job.started_at = time.time()
+            JOB_WAIT.observe(job.started_at - job.created_at)
+            try:
+                job.result = await self.handler(job.payload)
+                job.status = "succeeded"
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # HTTPException carries the message the API would have returned in detail
+                job.error = getattr(e, "detail", None) or str(e)
+                job.status = "failed"
+                self.logging.error(f"Job {job.id} failed on worker {number}: {job.error}")
+            finally:
+                job.finished_at = time.time()
+                self._running -= 1
+                self._queue.task_done()
+
+            duration = job.finished_at - job.started_at
+            JOBS.inc(status=job.status)
+            JOB_DURATION.observe(duration, status=job.status)
+            # Moving average, so Retry-After follows the current load
+            self._avg_seconds = duration if self._avg_seconds is None else 0.8 * self._avg_seconds + 0.2 * duration
@@ -0,0 +1,135 @@
+import re
+import ast
+import json
+from typing import Any, Dict, List, Optional
+
+_SPECIAL_CHARS = "{}\"'\\"
+_SPECIAL = re.compile(r"[{}\"'\\]")
+# A failed candidate is scanned again from the next '{' inside it. Capping the rescanned text at this
+# multiple of the input keeps the worst case ('{ ' * n, nothing ever closing) linear.
+RESCAN_FACTOR = 4
+
+class JsonObjectScanner:
+    """
+    Single-pass, incremental scanner for top-level '{...}' objects in model output.
+
+    Tracks brace depth and quoted strings over the structural characters only,
+    so every character is looked at once and each candidate object is parsed once:
+    total work is linear in the input, with no regex backtracking. Chunks can
+    be fed as they stream in; objects split across chunks are handled.
+    Candidates are parsed as JSON first, then as Python literals
+    (True/False/None, single quotes). A candidate that does not parse, or is
+    still open at the end of the input (call finish()), is rescanned from the
+    next '{' inside it, so a stray brace in prose does not hide a later object.
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._quote = None      # quote char of the string we are inside, if any
+        self._escaped = False
+        self._current: List[str] = []
+        self._fed = 0
+        self._rescanned = 0
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """ Scan the next piece of text. Returns the objects completed within it. """
+        found = []
+        self._fed += len(chunk)
+        while chunk:
+            chunk = self._scan(chunk, found)
+        return found
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """ End of input. Returns the objects found inside a candidate that never closed. """
+        found = []
+        while self._depth:
+            chunk = self._resync("".join(self._current))
+            if chunk is None:
+                break
+            while chunk:
+                chunk = self._scan(chunk, found)
+        return found
+
+    def _resync(self, candidate: str) -> Optional[str]:
+        """
+        Drop a failed candidate and return its text from the next '{' on, to be scanned again.
+        None when it has no other '{' or the rescan budget is spent.
+        """
+        next_open = candidate.find("{", 1)
+        if next_open < 0 or self._rescanned + len(candidate) - next_open > RESCAN_FACTOR * self._fed:
+            return None
+        self._rescanned += len(candidate) - next_open
+        self._depth = 0
+        self._quote = None
+        self._escaped = False
+        self._current = []
+        return candidate[next_open:]
+
+    def _scan(self, chunk: str, found: List[Dict[str, Any]]) -> str:
+        """ Scan chunk, adding completed objects to found. Returns text still to scan after a resync, or "". """
+        start = 0 if self._depth else None
+        if self._escaped and chunk and chunk[0] not in _SPECIAL_CHARS:
+            # The previous chunk ended on a backslash escaping an ordinary character
+            self._escaped = False
+        # Only these characters change the scanner state; everything else is skipped in C
+        for match in _SPECIAL.finditer(chunk):
+            ch = match.group()
+            i = match.start()
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    start = i
+                continue
+
+            if self._escaped:
+                self._escaped = False
+            elif self._quote:
+                if ch == "\\":
+                    # Skip the escaped character, which may not be special at all
+                    self._escaped = i + 1 == len(chunk) or chunk[i + 1] in _SPECIAL_CHARS
+                elif ch == self._quote:
+                    self._quote = None
+            elif ch == '"' or ch == "'":
+                self._quote = ch
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._current.append(chunk[start:i + 1])
+                    candidate = "".join(self._current)
+                    parsed = parse_object(candidate)
+                    self._current = []
+                    start = None
+                    if parsed is not None:
+                        found.append(parsed)
+                    else:
+                        # An object may start inside it ('{topic {"a": 1}}'): scan again from there
+                        rest = self._resync(candidate)
+                        if rest:
+                            return rest + chunk[i + 1:]
+
+        if self._depth and start is not None:
+            # Object continues in the next chunk
+            self._current.append(chunk[start:])
+        return ""
+
+def parse_object(text: str) -> Optional[Dict[str, Any]]:
+    """ Parse one '{...}' candidate as JSON or a Python dict literal. None if it is neither. """
+    if ":" not in text:
+        # Not a mapping (e.g. '{placeholder}' in prose); skip the parsers
+        return None
+    try:
+        value = json.loads(text)
+    except ValueError:
+        try:
+            value = ast.literal_eval(text)
+        except (ValueError, SyntaxError, MemoryError, RecursionError):
+            return None
+    return value if isinstance(value, dict) else None
+
+def extract_json_object(text: str) -> Optional[Dict[str, Any]]:
+    """ Returns the first parseable top-level object in text (fenced or not), or None. """
+    scanner = JsonObjectScanner()
+    objects = scanner.feed(text or "") or scanner.finish()
+    return objects[0] if objects else None
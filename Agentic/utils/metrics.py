@@ -0,0 +1,273 @@
+import time
+import asyncio
+import functools
+import threading
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Latency buckets in seconds, from fast tool calls to full image generation runs
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+# Quantiles are computed over the most recent observations of each series
+QUANTILES = (0.5, 0.95, 0.99)
+QUANTILE_WINDOW = 1024
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_str(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+class Counter:
+    """ Monotonic counter with optional labels. """
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[Tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels.get(label, "") for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_str(dict(zip(self.labels, key)))} {value:g}")
+        return lines
+
+class Gauge:
+    """ Gauge whose value is read from a callback when metrics are rendered. """
+
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self) -> List[str]:
+        try:
+            value = float(self.read())
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value:g}"]
+
+class Histogram:
+    """
+    Prometheus histogram (cumulative buckets, _sum, _count) per label set.
+    Also keeps a window of recent observations so p50/p95/p99 can be exported
+    directly as '<name>_quantile'.
+    """
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels.get(label, "") for label in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {
+                    "buckets": [0] * len(self.buckets),
+                    "sum": 0.0,
+                    "count": 0,
+                    "recent": deque(maxlen=QUANTILE_WINDOW),
+                }
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series["buckets"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+            series["recent"].append(value)
+
+    def label_sets(self) -> List[Dict[str, Any]]:
+        """ The label values of every series observed so far. """
+        with self._lock:
+            return [dict(zip(self.labels, key)) for key in self._series]
+
+    def quantiles(self, **labels) -> Dict[float, float]:
+        key = tuple(labels.get(label, "") for label in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            recent = sorted(series["recent"]) if series else []
+        if not recent:
+            return {}
+        return {q: recent[min(len(recent) - 1, int(q * len(recent)))] for q in QUANTILES}
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        quantile_lines = [
+            f"# HELP {self.name}_quantile {self.help} (last {QUANTILE_WINDOW} observations)",
+            f"# TYPE {self.name}_quantile gauge",
+        ]
+        with self._lock:
+            series_items = sorted(
+                (key, list(series["buckets"]), series["sum"], series["count"], sorted(series["recent"]))
+                for key, series in self._series.items()
+            )
+        for key, buckets, total, count, recent in series_items:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, buckets):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_label_str({**labels, 'le': f'{bound:g}'})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_label_str({**labels, 'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_label_str(labels)} {total:.6f}")
+            lines.append(f"{self.name}_count{_label_str(labels)} {count}")
+            for q in QUANTILES:
+                value = recent[min(len(recent) - 1, int(q * len(recent)))]
+                quantile_lines.append(f"{self.name}_quantile{_label_str({**labels, 'quantile': q})} {value:.6f}")
+        return lines + quantile_lines
+
+class MetricsRegistry:
+    """ Holds every metric of the process and renders them in the Prometheus text format. """
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._stats: Dict[Tuple[str, str, str], Callable[[], Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        with self._lock:
+            return self._metrics.setdefault(name, Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        with self._lock:
+            return self._metrics.setdefault(name, Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]) -> Gauge:
+        with self._lock:
+            self._metrics[name] = Gauge(name, help, read)
+            return self._metrics[name]
+
+    def register_cache(self, name: str, stats: Callable[[], Dict[str, float]]):
+        """ Export a cache's stats() (hits, misses, hit_rate, entries, ...) as gauges labelled cache=<name>. """
+        self.register_stats("orion_cache", "cache", name, stats)
+
+    def register_stats(self, prefix: str, label: str, name: str, stats: Callable[[], Dict[str, float]]):
+        """ Export every numeric field of stats() as a gauge <prefix>_<field>{<label>=<name>}. """
+        with self._lock:
+            self._stats[(prefix, label, name)] = stats
+
+    def _render_stats(self) -> List[str]:
+        with self._lock:
+            sources = sorted(self._stats.items())
+        samples: Dict[str, List[str]] = {}
+        for (prefix, label, name), stats in sources:
+            try:
+                values = stats()
+            except Exception:
+                continue
+            if values is None:
+                continue
+            for field, value in values.items():
+                if isinstance(value, (int, float)):
+                    samples.setdefault(f"{prefix}_{field}", []).append(f"{prefix}_{field}{_label_str({label: name})} {value:g}")
+        lines = []
+        for metric, metric_lines in sorted(samples.items()):
+            lines.append(f"# TYPE {metric} gauge")
+            lines.extend(metric_lines)
+        return lines
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        lines.extend(self._render_stats())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+AGENT_LATENCY = metrics.histogram("orion_agent_duration_seconds", "Time spent in each agent invocation", ("agent",))
+TOOL_LATENCY = metrics.histogram("orion_tool_call_duration_seconds", "Time from a tool call to its response, as seen by the runner", ("tool",))
+FUNCTION_LATENCY = metrics.histogram("orion_tool_function_duration_seconds", "Time spent inside tool functions", ("function",))
+LLM_CALLS = metrics.counter("orion_llm_calls_total", "LLM responses received per agent", ("agent",))
+LLM_TOKENS = metrics.counter("orion_llm_tokens_total", "Tokens used per agent", ("agent",))
+LOOP_ITERATIONS = metrics.histogram("orion_loop_iterations", "Iterations run by loop agents", ("agent",), buckets=(1, 2, 3, 4, 5, 10))
+LOOP_STOPS = metrics.counter("orion_loop_stops_total", "Why loop agents stopped", ("agent", "reason"))
+
+# Agent runs in progress, by (invocation, agent). AgentTool runs Web_info and image_generation_agent
+# in a nested runner that the outer event stream never sees, so agents time themselves via callbacks
+_agent_starts: Dict[Tuple[str, str], float] = {}
+
+def start_agent_span(callback_context) -> None:
+    """ before_agent_callback: start timing this agent's run. """
+    _agent_starts[(callback_context.invocation_id, callback_context.agent_name)] = time.perf_counter()
+    return None
+
+def end_agent_span(callback_context) -> None:
+    """ after_agent_callback: record the agent's run in AGENT_LATENCY. """
+    started = _agent_starts.pop((callback_context.invocation_id, callback_context.agent_name), None)
+    if started is not None:
+        AGENT_LATENCY.observe(time.perf_counter() - started, agent=callback_context.agent_name)
+    return None
+
+def record_llm_call(callback_context, llm_response) -> None:
+    """ after_model_callback: count the model call and its tokens for the agent. """
+    if llm_response.partial:
+        return None
+    LLM_CALLS.inc(agent=callback_context.agent_name)
+    usage = llm_response.usage_metadata
+    if usage and usage.total_token_count:
+        LLM_TOKENS.inc(usage.total_token_count, agent=callback_context.agent_name)
+    return None
+
+class RunTracer:
+    """
+    Turns the runner.run_async event stream into tool spans: from the function call
+    event to the matching function response event. Agent spans and model calls are
+    recorded by the agents' callbacks (start_agent_span, record_llm_call).
+    """
+
+    def __init__(self):
+        self._tool_calls: Dict[str, Tuple[str, float]] = {}
+
+    def observe(self, event):
+        now = time.perf_counter()
+        for call in event.get_function_calls():
+            self._tool_calls[call.id or call.name] = (call.name, now)
+        for result in event.get_function_responses():
+            name, started = self._tool_calls.pop(result.id or result.name, (result.name, None))
+            if started is not None:
+                TOOL_LATENCY.observe(now - started, tool=name)
+
+    def finish(self):
+        self._tool_calls.clear()
+
+def timed(name: Optional[str] = None):
+    """ Decorator recording the duration of a (sync or async) function in FUNCTION_LATENCY. """
+    def decorator(func):
+        label = name or func.__name__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    FUNCTION_LATENCY.observe(time.perf_counter() - started, function=label)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                FUNCTION_LATENCY.observe(time.perf_counter() - started, function=label)
+        return wrapper
+
+    return decorator
@@ -0,0 +1,187 @@
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+from .metrics import metrics
+
+# Process-wide Gemini budgets. RPM 0 disables the request-rate limit of that budget;
+# concurrency is the ceiling the adaptive limit grows back to after rate-limit errors
+BUDGETS = {
+    "text": {
+        "requests_per_minute": float(os.getenv("GEMINI_TEXT_RPM", 1000)),
+        "max_concurrency": int(os.getenv("GEMINI_TEXT_CONCURRENCY", 16)),
+    },
+    "search": {
+        "requests_per_minute": float(os.getenv("GEMINI_SEARCH_RPM", 100)),
+        "max_concurrency": int(os.getenv("GEMINI_SEARCH_CONCURRENCY", 4)),
+    },
+    "image": {
+        "requests_per_minute": float(os.getenv("GEMINI_IMAGE_RPM", 60)),
+        "max_concurrency": int(os.getenv("MAX_CONCURRENT_IMAGES", 4)),
+    },
+}
+# Retries of a rate-limited call, with full-jitter exponential backoff between them
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", 4))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", 1.0))
+GEMINI_BACKOFF_MAX = float(os.getenv("GEMINI_BACKOFF_MAX", 30.0))
+
+RATE_LIMIT_WAIT = metrics.histogram("orion_rate_limit_wait_seconds", "Time calls waited for a rate-limiter token and slot", ("budget",))
+RATE_LIMIT_ERRORS = metrics.counter("orion_rate_limit_errors_total", "Rate-limit (429) errors returned by Gemini", ("budget",))
+RATE_LIMIT_RETRIES = metrics.counter("orion_rate_limit_retries_total", "Calls retried after a rate-limit error", ("budget",))
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """ True for Gemini 429 / RESOURCE_EXHAUSTED errors, whichever client raised them. """
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    return "RESOURCE_EXHAUSTED" in str(error)
+
+
+class TokenBucket:
+    """ Allows requests_per_minute on average, with bursts of up to burst requests. """
+
+    def __init__(self, requests_per_minute: float, burst: int):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        """ Take one token, waiting for the bucket to refill. Waiters are served in order. """
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+    def available(self) -> float:
+        if self.rate <= 0:
+            return self.capacity
+        self._refill()
+        return self.tokens
+
+
+class AdaptiveLimiter:
+    """
+    Token bucket plus an AIMD concurrency limit for one Gemini budget.
+
+    Every call takes a token and an in-flight slot. A successful call grows the
+    limit by 1/limit (about +1 per round of calls); a rate-limit error halves
+    it, down to min_concurrency. call() retries rate-limited work with
+    full-jitter exponential backoff.
+    """
+
+    def __init__(self, name: str, requests_per_minute: float, max_concurrency: int, min_concurrency: int = 1,
+                 burst: Optional[int] = None, max_retries: int = GEMINI_MAX_RETRIES,
+                 backoff_base: float = GEMINI_BACKOFF_BASE, backoff_max: float = GEMINI_BACKOFF_MAX):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = float(self.max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(requests_per_minute, burst or self.max_concurrency)
+        self.in_flight = 0
+        self._waiters: deque = deque()
+        metrics.register_stats("orion_rate_limiter", "budget", name, self.stats)
+
+    @property
+    def concurrency(self) -> int:
+        return max(self.min_concurrency, int(self.limit))
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "concurrency_limit": self.concurrency,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "tokens": round(self.bucket.available(), 3),
+        }
+
+    def backoff(self, attempt: int) -> float:
+        """ Full jitter: uniform in [0, min(max, base * 2^attempt)]. """
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _wake(self):
+        free = self.concurrency - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    async def _enter(self):
+        while self.in_flight >= self.concurrency:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Woken but no longer interested: hand the slot on
+                    self._wake()
+                raise
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        self.in_flight += 1
+
+    def _exit(self, rate_limited: bool):
+        self.in_flight -= 1
+        if rate_limited:
+            RATE_LIMIT_ERRORS.inc(budget=self.name)
+            self.limit = max(float(self.min_concurrency), self.limit / 2)
+        else:
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self):
+        """ Hold one request's worth of budget; the outcome of the block adjusts the limit. """
+        started = time.perf_counter()
+        await self.bucket.acquire()
+        await self._enter()
+        RATE_LIMIT_WAIT.observe(time.perf_counter() - started, budget=self.name)
+        try:
+            yield
+        except BaseException as e:
+            self._exit(rate_limited=is_rate_limit_error(e))
+            raise
+        else:
+            self._exit(rate_limited=False)
+
+    async def retry_or_raise(self, error: BaseException, attempt: int):
+        """ Sleep before retry number attempt + 1 of a rate-limited call, or re-raise error. """
+        if not is_rate_limit_error(error) or attempt >= self.max_retries:
+            raise error
+        RATE_LIMIT_RETRIES.inc(budget=self.name)
+        await asyncio.sleep(self.backoff(attempt))
+
+    async def call(self, work: Callable[[], Awaitable[Any]]) -> Any:
+        """ Run work() under this budget, retrying rate-limit errors. """
+        attempt = 0
+        while True:
+            try:
+                async with self.slot():
+                    return await work()
+            except Exception as e:
+                await self.retry_or_raise(e, attempt)
+                attempt += 1
+
+
+limiters: Dict[str, AdaptiveLimiter] = {name: AdaptiveLimiter(name, **budget) for name, budget in BUDGETS.items()}
+
+def get_limiter(budget: str) -> AdaptiveLimiter:
+    return limiters[budget]
@@ -0,0 +1,81 @@
+import os
+import json
+import hashlib
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+from .ttl_cache import TTLCache
+from .metrics import metrics
+from .single_flight import SingleFlight
+
+# Finished posts and images, keyed on the finalized problem_config (+ web info)
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", 24 * 60 * 60))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", 512))
+# A post or image is only memoized once these problem_config fields are filled in
+FINALIZED_FIELDS = ("title", "summary", "keywords", "post_type", "target_audience")
+
+result_cache = TTLCache(max_entries=RESULT_CACHE_MAX_ENTRIES, ttl_seconds=RESULT_CACHE_TTL)
+metrics.register_cache("result", result_cache.stats)
+
+# Results being generated right now: other sessions asking for the same key wait for them
+_generations = SingleFlight()
+
+# Set per request: skip cached results and generate fresh ones (which then replace the cached entry)
+_bypass = ContextVar("result_cache_bypass", default=False)
+
+@contextmanager
+def result_cache_bypass(enabled: bool = True):
+    """ Within this block, result_cache_bypassed() is True. Propagates to tasks started inside it. """
+    token = _bypass.set(enabled)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+def result_cache_bypassed() -> bool:
+    return _bypass.get()
+
+def _normalize(value: Any) -> Any:
+    """ Canonical form of a config value: trimmed, single-spaced strings; empty values dropped. """
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, (list, tuple)):
+        return [item for item in (_normalize(v) for v in value) if item not in (None, "", [], {})]
+    if isinstance(value, dict):
+        normalized = {str(k).strip().lower(): _normalize(v) for k, v in value.items()}
+        return {k: v for k, v in normalized.items() if v not in (None, "", [], {})}
+    return value
+
+def canonical_hash(value: Any) -> str:
+    """ sha256 of the canonical JSON of value: key order, whitespace and unset fields do not change it. """
+    canonical = json.dumps(_normalize(value), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def result_cache_key(kind: str, problem_config: Optional[Dict[str, Any]], web_info_output: Any = None) -> str:
+    """ Cache key of a result of the given kind for this problem_config and web info. """
+    return canonical_hash({"kind": kind, "config": problem_config or {}, "web_info": web_info_output})
+
+def get_result(key: str) -> Any:
+    """ Cached result for key, or None when missing, expired or bypassed for this request. """
+    if result_cache_bypassed():
+        return None
+    return result_cache.get(key)
+
+async def await_result(key: str) -> Any:
+    """ get_result(), after waiting for a generation of key already in flight (in any session) to finish. """
+    if result_cache_bypassed():
+        return None
+    await _generations.wait(key)
+    return get_result(key)
+
+def generating(key: Optional[str]):
+    """ Context manager around generating key's result, so await_result(key) callers wait for it. No-op without a key. """
+    return _generations.lead(key) if key else nullcontext()
+
+def store_result(key: str, value: Any):
+    if value:
+        result_cache.set(key, value)
+
+def is_finalized(problem_config: Optional[Dict[str, Any]]) -> bool:
+    config = _normalize(problem_config or {})
+    return all(config.get(field) for field in FINALIZED_FIELDS)
@@ -0,0 +1,118 @@
+import asyncio
+import copy
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict
+from .agent_utils import create_session, retrieve_session
+
+# Initial state for every new session
+DEFAULT_SESSION_STATE = {
+    "problem_config":   {
+        # Core content details
+        "post_type": None,            # e.g., 'impact_story', 'blog', 'flyer', 'social_awareness', 'etc'
+        "title": None,                # Optional title for post
+        "summary": None,              # Short summary or description
+        "keywords": None,             # List of relevant keywords or hashtags
+
+        # Content format & style
+        "tone": "motivational",                 # e.g., 'formal', 'casual', 'emotional', 'motivational'
+        "length": "medium",               # e.g., 'short', 'medium', 'long'
+        "language": "english",             # Default language
+        "style": None,
+
+        # Media & references
+        "external_reference_links": None,       # URLs for references or sources
+        "hashtags": None,
+
+        # Target & audience
+        "target_audience": None,      # e.g., 'students', 'general public', 'environment activists'
+
+        # Optional constraints
+        "special_requirements": None  # e.g., 'include statistics', 'cite sources', 'focus on local region'
+    },
+    "generated_post": None,
+    "final_image": None,
+    "final_post": None,
+    "web_info_output": None,
+    # Stages whose output is out of date after a problem_config change (see utils.stage_graph)
+    "stale_stages": [],
+}
+
+
+def default_session_state() -> dict:
+    """ Returns a fresh copy of the initial session state. """
+    return copy.deepcopy(DEFAULT_SESSION_STATE)
+
+
+class SessionManager:
+    """
+    Looks up or creates sessions on demand and serializes turns per session.
+
+    Different sessions run concurrently on the shared runner; turns of the same
+    session are queued behind a per-session lock so they never interleave on the
+    same state. A global semaphore bounds how many sessions are in flight at once.
+    """
+
+    def __init__(self, session_service, app_name: str, logging: logging.Logger, max_concurrent_sessions: int = 32):
+        self.session_service = session_service
+        self.app_name = app_name
+        self.logging = logging
+        self.max_concurrent_sessions = max_concurrent_sessions
+        self._slots = asyncio.Semaphore(max_concurrent_sessions)
+        self._locks: Dict[tuple, asyncio.Lock] = {}
+        self._waiters: Dict[tuple, int] = {}
+        self._create_lock = asyncio.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        """ Number of sessions currently holding a slot. """
+        return self.max_concurrent_sessions - self._slots._value
+
+    async def get_or_create(self, user_id: str, session_id: str):
+        """ Retrieve the session, creating it with the default state if it does not exist yet. """
+        session = await retrieve_session(
+            session_service=self.session_service,
+            app_name=self.app_name,
+            user_id=user_id,
+            session_id=session_id,
+            logging=self.logging
+        )
+        if session:
+            return session
+
+        # Double-checked so two first requests for the same session create it only once
+        async with self._create_lock:
+            session = await retrieve_session(
+                session_service=self.session_service,
+                app_name=self.app_name,
+                user_id=user_id,
+                session_id=session_id,
+                logging=self.logging
+            )
+            if not session:
+                session = await create_session(
+                    session_service=self.session_service,
+                    app_name=self.app_name,
+                    user_id=user_id,
+                    session_id=session_id,
+                    state=default_session_state(),
+                    logging=self.logging
+                )
+        return session
+
+    @asynccontextmanager
+    async def acquire(self, user_id: str, session_id: str):
+        """ Hold the per-session lock and a global in-flight slot for the duration of one turn. """
+        key = (user_id, session_id)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            async with lock:
+                async with self._slots:
+                    yield await self.get_or_create(user_id, session_id)
+        finally:
+            self._waiters[key] -= 1
+            if self._waiters[key] == 0:
+                # Nobody else is waiting on this session, drop the lock
+                del self._waiters[key]
+                self._locks.pop(key, None)
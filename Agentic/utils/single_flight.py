@@ -0,0 +1,68 @@
+import asyncio
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable
+from .metrics import metrics
+
+FLIGHTS = metrics.counter("orion_single_flight_total", "Coalesced requests: 'leader' ran the work, 'joined' shared it", ("role",))
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller starts the
+    work, callers arriving while it runs await the same result (or exception).
+
+    The work runs in its own task, so a caller that disconnects or is cancelled
+    does not cancel it for the others. Nothing is cached once the work finishes.
+
+    Work that has to run in the caller's own context (an agent's event stream) uses
+    lead() and wait() instead: the leader does the work itself and the others wait
+    for it to finish, then pick up its result from wherever the leader stored it.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Any:
+        """ Run work() once per key at a time; returns its result to every caller. """
+        task = self._flights.get(key)
+        if task is None:
+            FLIGHTS.inc(role="leader")
+            task = asyncio.create_task(work())
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._land(key, done))
+        else:
+            FLIGHTS.inc(role="joined")
+        return await asyncio.shield(task)
+
+    def _land(self, key: Hashable, task: asyncio.Task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            # Mark the exception as retrieved even if every caller went away
+            task.exception()
+
+    @contextmanager
+    def lead(self, key: Hashable):
+        """ Mark key in flight while the caller does the work inside this block. """
+        FLIGHTS.inc(role="leader")
+        done = asyncio.get_running_loop().create_future()
+        self._flights[key] = done
+        try:
+            yield
+        finally:
+            if self._flights.get(key) is done:
+                del self._flights[key]
+            done.set_result(None)
+
+    async def wait(self, key: Hashable) -> bool:
+        """ Wait until the work in flight under key, if any, has finished. Returns whether there was one. """
+        flight = self._flights.get(key)
+        if flight is None:
+            return False
+        FLIGHTS.inc(role="joined")
+        # The leader's outcome is not passed on: it left its result (if any) where the caller looks next
+        await asyncio.wait([flight])
+        return True
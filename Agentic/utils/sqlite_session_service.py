@@ -0,0 +1,250 @@
+import json
+import time
+import uuid
+import asyncio
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name    TEXT NOT NULL,
+    user_id     TEXT NOT NULL,
+    session_id  TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id)
+);
+CREATE TABLE IF NOT EXISTS session_state (
+    app_name   TEXT NOT NULL,
+    user_id    TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    value      TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, key)
+);
+CREATE TABLE IF NOT EXISTS user_state (
+    app_name TEXT NOT NULL,
+    user_id  TEXT NOT NULL,
+    key      TEXT NOT NULL,
+    value    TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id, key)
+);
+CREATE TABLE IF NOT EXISTS app_state (
+    app_name TEXT NOT NULL,
+    key      TEXT NOT NULL,
+    value    TEXT NOT NULL,
+    PRIMARY KEY (app_name, key)
+);
+CREATE TABLE IF NOT EXISTS events (
+    seq           INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name      TEXT NOT NULL,
+    user_id       TEXT NOT NULL,
+    session_id    TEXT NOT NULL,
+    event_id      TEXT NOT NULL,
+    invocation_id TEXT,
+    timestamp     REAL NOT NULL,
+    data          TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_session ON events (app_name, user_id, session_id, seq);
+CREATE INDEX IF NOT EXISTS idx_events_session_time ON events (app_name, user_id, session_id, timestamp);
+"""
+
+class SqliteSessionService(BaseSessionService):
+    """
+    ADK session service backed by a SQLite file in WAL mode.
+
+    State is stored one row per key, so appending an event only upserts the keys
+    in its state_delta instead of rewriting the whole state. 'app:' and 'user:'
+    keys go to their shared tables; 'temp:' keys are never persisted. Several
+    uvicorn workers can point at the same file.
+
+    With max_events set, get_session loads only the most recent events unless the
+    caller asks otherwise; older events stay in the file.
+    """
+
+    def __init__(self, db_path: str = "sessions.db", busy_timeout_ms: int = 5000, max_events: int = 0):
+        self.db_path = db_path
+        self.max_events = max_events
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+            self._conn.executescript(_SCHEMA)
+
+    # ------------------ helpers (run in a worker thread) ------------------
+
+    def _run(self, fn, *args, **kwargs):
+        return asyncio.to_thread(self._locked, fn, *args, **kwargs)
+
+    def _locked(self, fn, *args, **kwargs):
+        with self._lock:
+            return fn(*args, **kwargs)
+
+    def _write_state(self, app_name: str, user_id: str, session_id: str, delta: Dict[str, Any]):
+        for key, value in delta.items():
+            if key.startswith(State.TEMP_PREFIX):
+                continue
+            encoded = json.dumps(value, default=str)
+            if key.startswith(State.APP_PREFIX):
+                self._conn.execute(
+                    "INSERT INTO app_state (app_name, key, value) VALUES (?, ?, ?) "
+                    "ON CONFLICT(app_name, key) DO UPDATE SET value = excluded.value",
+                    (app_name, key.removeprefix(State.APP_PREFIX), encoded),
+                )
+            elif key.startswith(State.USER_PREFIX):
+                self._conn.execute(
+                    "INSERT INTO user_state (app_name, user_id, key, value) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(app_name, user_id, key) DO UPDATE SET value = excluded.value",
+                    (app_name, user_id, key.removeprefix(State.USER_PREFIX), encoded),
+                )
+            else:
+                self._conn.execute(
+                    "INSERT INTO session_state (app_name, user_id, session_id, key, value) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(app_name, user_id, session_id, key) DO UPDATE SET value = excluded.value",
+                    (app_name, user_id, session_id, key, encoded),
+                )
+
+    def _load_state(self, app_name: str, user_id: str, session_id: str) -> Dict[str, Any]:
+        state = {}
+        for key, value in self._conn.execute(
+            "SELECT key, value FROM session_state WHERE app_name = ? AND user_id = ? AND session_id = ?",
+            (app_name, user_id, session_id),
+        ):
+            state[key] = json.loads(value)
+        for key, value in self._conn.execute(
+            "SELECT key, value FROM user_state WHERE app_name = ? AND user_id = ?", (app_name, user_id)
+        ):
+            state[State.USER_PREFIX + key] = json.loads(value)
+        for key, value in self._conn.execute(
+            "SELECT key, value FROM app_state WHERE app_name = ?", (app_name,)
+        ):
+            state[State.APP_PREFIX + key] = json.loads(value)
+        return state
+
+    def _create_session_sync(self, app_name: str, user_id: str, state: Optional[Dict[str, Any]], session_id: Optional[str]) -> Session:
+        session_id = session_id.strip() if session_id and session_id.strip() else str(uuid.uuid4())
+        now = time.time()
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "INSERT INTO sessions (app_name, user_id, session_id, create_time, update_time) VALUES (?, ?, ?, ?, ?)",
+                (app_name, user_id, session_id, now, now),
+            )
+            self._write_state(app_name, user_id, session_id, state or {})
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=self._load_state(app_name, user_id, session_id),
+            last_update_time=now,
+        )
+
+    def _get_session_sync(self, app_name: str, user_id: str, session_id: str, config: Optional[GetSessionConfig]) -> Optional[Session]:
+        row = self._conn.execute(
+            "SELECT update_time FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?",
+            (app_name, user_id, session_id),
+        ).fetchone()
+        if row is None:
+            return None
+
+        where = "app_name = ? AND user_id = ? AND session_id = ?"
+        params = [app_name, user_id, session_id]
+        if config and config.after_timestamp:
+            where += " AND timestamp >= ?"
+            params.append(config.after_timestamp)
+        num_recent_events = config.num_recent_events if config and config.num_recent_events else self.max_events
+        if num_recent_events:
+            query = f"SELECT data FROM (SELECT seq, data FROM events WHERE {where} ORDER BY seq DESC LIMIT ?) ORDER BY seq"
+            params.append(num_recent_events)
+        else:
+            query = f"SELECT data FROM events WHERE {where} ORDER BY seq"
+        events = [Event.model_validate_json(data) for (data,) in self._conn.execute(query, params)]
+
+        return Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=self._load_state(app_name, user_id, session_id),
+            events=events,
+            last_update_time=row[0],
+        )
+
+    def _list_sessions_sync(self, app_name: str, user_id: str) -> ListSessionsResponse:
+        rows = self._conn.execute(
+            "SELECT session_id, update_time FROM sessions WHERE app_name = ? AND user_id = ?",
+            (app_name, user_id),
+        ).fetchall()
+        return ListSessionsResponse(sessions=[
+            Session(app_name=app_name, user_id=user_id, id=session_id, state={}, last_update_time=update_time)
+            for session_id, update_time in rows
+        ])
+
+    def _delete_session_sync(self, app_name: str, user_id: str, session_id: str):
+        key = (app_name, user_id, session_id)
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+            self._conn.execute("DELETE FROM session_state WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+            self._conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _append_event_sync(self, session: Session, event: Event):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute(
+                "INSERT INTO events (app_name, user_id, session_id, event_id, invocation_id, timestamp, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (session.app_name, session.user_id, session.id, event.id, event.invocation_id,
+                 event.timestamp, event.model_dump_json(exclude_none=True)),
+            )
+            if event.actions and event.actions.state_delta:
+                self._write_state(session.app_name, session.user_id, session.id, event.actions.state_delta)
+            self._conn.execute(
+                "UPDATE sessions SET update_time = ? WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                (event.timestamp, session.app_name, session.user_id, session.id),
+            )
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    # ------------------ BaseSessionService ------------------
+
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[Dict[str, Any]] = None, session_id: Optional[str] = None) -> Session:
+        return await self._run(self._create_session_sync, app_name, user_id, state, session_id)
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str, config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        return await self._run(self._get_session_sync, app_name, user_id, session_id, config)
+
+    async def list_sessions(self, *, app_name: str, user_id: str) -> ListSessionsResponse:
+        return await self._run(self._list_sessions_sync, app_name, user_id)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await self._run(self._delete_session_sync, app_name, user_id, session_id)
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        if event.partial:
+            return event
+        # Updates the in-memory session object (state delta + event list)
+        await super().append_event(session=session, event=event)
+        session.last_update_time = event.timestamp
+        await self._run(self._append_event_sync, session, event)
+        return event
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,73 @@
+from typing import Any, Dict, List, Mapping, Optional
+from .result_cache import canonical_hash
+
+# What each pipeline stage's output is derived from:
+#   problem_config fields -> web_info_output -> final_post
+#   problem_config fields -> final_image (the image is built from the config, not from the post)
+STAGES = {
+    "web_info": {
+        "output": "web_info_output",
+        "config": ("title", "summary"),
+        "state": (),
+    },
+    "post": {
+        "output": "final_post",
+        "config": (
+            "post_type", "title", "summary", "keywords", "tone", "length", "language", "style",
+            "external_reference_links", "hashtags", "target_audience", "special_requirements",
+        ),
+        "state": ("web_info_output",),
+    },
+    "image": {
+        "output": "final_image",
+        "config": ("post_type", "title", "summary", "keywords", "style", "target_audience"),
+        "state": (),
+    },
+}
+
+# Post inputs an existing post can follow with a single edit pass instead of a full rewrite
+POST_EDIT_FIELDS = ("tone", "hashtags", "keywords", "length", "special_requirements")
+
+def inputs_key(stage: str) -> str:
+    """ State key holding the input fingerprints a stage's output was derived from (one key per stage). """
+    return f"{stage}_inputs"
+
+def stage_inputs(stage: str, state: Mapping[str, Any]) -> Dict[str, str]:
+    """ Fingerprint of every input of stage in the current state. """
+    spec = STAGES[stage]
+    config = state.get("problem_config") or {}
+    fingerprints = {field: canonical_hash(config.get(field)) for field in spec["config"]}
+    fingerprints.update({key: canonical_hash(state.get(key)) for key in spec["state"]})
+    return fingerprints
+
+def changed_inputs(stage: str, state: Mapping[str, Any]) -> Optional[List[str]]:
+    """
+    Inputs of stage that changed since its output was produced: [] when the output is up to date,
+    None when there is no output or no record of its inputs (the stage has to run in full).
+    """
+    recorded = state.get(inputs_key(stage))
+    if not state.get(STAGES[stage]["output"]) or not recorded:
+        return None
+    current = stage_inputs(stage, state)
+    return [name for name, fingerprint in current.items() if recorded.get(name) != fingerprint]
+
+def is_fresh(stage: str, state: Mapping[str, Any]) -> bool:
+    return changed_inputs(stage, state) == []
+
+def record_stage(stage: str, state: Mapping[str, Any]) -> Dict[str, Any]:
+    """ state_delta recording that stage's output now matches its current inputs. """
+    return {
+        inputs_key(stage): stage_inputs(stage, state),
+        "stale_stages": [name for name in state.get("stale_stages") or [] if name != stage],
+    }
+
+def stale_stages(state: Mapping[str, Any]) -> List[str]:
+    """ Stages that have an output whose inputs changed since it was produced. """
+    return [stage for stage in STAGES if changed_inputs(stage, state)]
+
+def describe_changes(fields: List[str], state: Mapping[str, Any]) -> str:
+    """ Edit instructions for a post whose POST_EDIT_FIELDS changed. """
+    config = state.get("problem_config") or {}
+    lines = [f"{index}. Update the post for the new '{field}': {config.get(field)}" for index, field in enumerate(fields, 1)]
+    lines.append(f"{len(fields) + 1}. Keep everything else unchanged.")
+    return "\n".join(lines)
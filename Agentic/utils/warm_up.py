@@ -0,0 +1,62 @@
+import time
+import importlib
+import logging
+from typing import Dict, Iterable
+
+# Everything a production worker needs before its first agent request:
+# the full agent tree (google.adk, google-genai, every tool) and the image stack
+WARM_UP_MODULES = (
+    "google.adk.runners",
+    "utils.agent_utils",
+    "utils.session_manager",
+    "agents.Base_agent",
+    "PIL.Image",
+    "numpy",
+    "pytesseract",
+)
+
+def warm_up(logging: logging.Logger, modules: Iterable[str] = WARM_UP_MODULES) -> Dict[str, float]:
+    """
+    Import the heavy modules and create the shared clients ahead of the first request.
+    Safe to call from a worker thread. Returns the seconds spent per step.
+    """
+    timings = {}
+    started = time.perf_counter()
+
+    for name in modules:
+        step = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            # Optional dependency (e.g. pytesseract) missing: its feature falls back at runtime
+            logging.warning(f"Warm-up: could not import {name}: {e}")
+            continue
+        timings[name] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    try:
+        from tools.genai_client import get_genai_client
+        get_genai_client()
+        timings["genai_client"] = time.perf_counter() - step
+    except Exception as e:
+        logging.warning(f"Warm-up: could not create the genai client: {e}")
+
+    step = time.perf_counter()
+    from tools.image_cache import get_image_cache
+    get_image_cache()
+    timings["image_cache"] = time.perf_counter() - step
+
+    step = time.perf_counter()
+    try:
+        from tools.image_variants import warm_variant_pool
+        warm_variant_pool()
+        timings["image_variant_pool"] = time.perf_counter() - step
+    except Exception as e:
+        logging.warning(f"Warm-up: could not start the image variant pool: {e}")
+
+    timings["total"] = time.perf_counter() - started
+    logging.info(
+        f"Warm-up finished in {timings['total']:.2f}s: "
+        + ", ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items() if name != "total")
+    )
+    return timings
@@ -35,7 +35,7 @@ export default function Chatbot() {
         id: messages.length + 2,
         sender: "bot",
         text: data.response || "⚠️ Sorry, I couldn’t generate a response.",
-        image: data.image_base64 ? `data:image/png;base64,${data.image_base64}` : undefined,
+        image: data.image_url ? `http://localhost:8000${data.image_url}` : undefined,
       };
 
       setMessages((prev) => [...prev, botMessage]);